@@ -0,0 +1,293 @@
+# analytics.py
+""" The analytics module breaks sales down over time: by day, week, month, quarter
+    and year, each overall, by make and by model, with the spread of profit margins
+    in every slice. Every combination is kept as its own precomputed table, so a
+    question like "profit by make for 2025-Q3" is a lookup rather than a pass over
+    the sales history. Long histories are first totalled in parallel by a process
+    pool; after that the tables are adjusted as each car is sold or changed."""
+from __future__ import annotations
+import csv
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import get_context
+from typing import Iterable
+from reports import SalesTotals
+from events import EventsLost
+
+PERIODS = ("day", "week", "month", "quarter", "year")
+GROUPINGS = ("all", "make", "model")
+MARGIN_BUCKET_PCT = 2.5  # Width of each margin histogram bucket, in percentage points
+PARALLEL_THRESHOLD = 200_000  # Sales histories at least this long are totalled across processes
+UNDATED = "undated"  # Period key for sales restored without a sold date
+
+def period_key(period: str, day: date | None) -> str:
+    """Names the period a day falls in, e.g. 2025-07-14, 2025-W29, 2025-07, 2025-Q3, 2025.
+    Keys of one period sort in time order."""
+    if day is None:
+        return UNDATED
+    if period == "day":
+        return day.isoformat()
+    if period == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == "month":
+        return f"{day.year}-{day.month:02d}"
+    if period == "quarter":
+        return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+    if period == "year":
+        return str(day.year)
+    raise ValueError(f"Period must be one of {', '.join(PERIODS)}.")
+
+def margin_pct(price: float, cost: float) -> float:
+    return (price - cost) / price * 100 if price else 0.0
+
+class RollupCell(SalesTotals):
+    """Sales totals for one period and group, plus a histogram of per-car profit margins."""
+    __slots__ = ("margins",)
+
+    def __init__(self, label: str = ""):
+        super().__init__(label)
+        self.margins: dict[int, int] = {}
+
+    def _add(self, sign: int, price: float, cost: float):
+        self._apply(sign, price, cost)
+        bucket = math.floor(margin_pct(price, cost) / MARGIN_BUCKET_PCT)
+        count = self.margins.get(bucket, 0) + sign
+        if count:
+            self.margins[bucket] = count
+        else:
+            del self.margins[bucket]
+
+    def _merge(self, other: RollupCell):
+        self.units += other.units
+        self.revenue += other.revenue
+        self.cost += other.cost
+        for bucket, count in other.margins.items():
+            self.margins[bucket] = self.margins.get(bucket, 0) + count
+
+    @property
+    def margin(self) -> float:
+        """Overall profit margin of the slice, in percent."""
+        return margin_pct(self.revenue, self.cost)
+
+    def margin_percentile(self, fraction: float) -> float:
+        """Margin (percent) below which the given fraction of cars in the slice sold, to bucket accuracy."""
+        target = fraction * self.units
+        seen = 0
+        for bucket in sorted(self.margins):
+            seen += self.margins[bucket]
+            if seen >= target:
+                return (bucket + 1) * MARGIN_BUCKET_PCT
+        return 0.0
+
+    def margin_histogram(self) -> list[tuple[float, float, int]]:
+        """(low %, high %, cars) for every margin bucket with any cars in it."""
+        return [(bucket * MARGIN_BUCKET_PCT, (bucket + 1) * MARGIN_BUCKET_PCT, self.margins[bucket])
+                for bucket in sorted(self.margins)]
+
+# table[(period, grouping)] -> {period key: {group key: RollupCell}}
+Tables = dict[tuple[str, str], dict[str, dict[str, RollupCell]]]
+
+def _group_keys(make: str, model: str) -> tuple[tuple[str, str], ...]:
+    """(grouping, (key, label)) pairs one sale is filed under."""
+    return (("all", ("", "All Sales")), ("make", (make.casefold(), make)),
+            ("model", (f"{make.casefold()}\0{model.casefold()}", f"{make} {model}")))
+
+def _periods(day: date | None, cache: dict) -> list[tuple[str, str]]:
+    periods = cache.get(day)
+    if periods is None:
+        periods = cache[day] = [(period, period_key(period, day)) for period in PERIODS]
+    return periods
+
+def _cell(tables: Tables, period: str, pkey: str, grouping: str, key: str, label: str) -> RollupCell:
+    groups = tables[(period, grouping)].setdefault(pkey, {})
+    cell = groups.get(key)
+    if cell is None:
+        cell = groups[key] = RollupCell(label)
+    return cell
+
+def _apply(tables: Tables, sign: int, day: date | None, make: str, model: str, price: float, cost: float,
+           period_cache: dict):
+    """Adds (sign 1) or takes back (sign -1) one sale in every table."""
+    for grouping, (key, label) in _group_keys(make, model):
+        for period, pkey in _periods(day, period_cache):
+            cell = _cell(tables, period, pkey, grouping, key, label)
+            cell._add(sign, price, cost)
+            if cell.units == 0:
+                groups = tables[(period, grouping)][pkey]
+                del groups[key] # Drop empty cells so running float sums never drift around zero
+                if not groups:
+                    del tables[(period, grouping)][pkey]
+
+def _empty_tables() -> Tables:
+    return {(period, grouping): {} for period in PERIODS for grouping in GROUPINGS}
+
+def total_by_day(rows: Iterable[tuple]) -> dict[tuple, RollupCell]:
+    """Totals (sold date, make, model, price, cost) rows per date, make and model. Runs in pool workers."""
+    base: dict[tuple, RollupCell] = {}
+    for day, make, model, price, cost in rows:
+        key = (day, make, model)
+        cell = base.get(key)
+        if cell is None:
+            cell = base[key] = RollupCell()
+        cell._add(1, price, cost)
+    return base
+
+def build_tables(base: dict[tuple, RollupCell]) -> Tables:
+    """Rolls the per-day totals up into every period and grouping table. Each period's model
+    table is built from the day cells, then makes from models and the overall from makes,
+    so every step works on far fewer cells than there were sales."""
+    tables = _empty_tables()
+    cache: dict = {}
+    make_of: dict[str, tuple[str, str]] = {} # model key -> (make key, make label)
+    for (day, make, model), day_cell in base.items():
+        _, (_, make_group), (_, (model_key, model_label)) = _group_keys(make, model)
+        make_of[model_key] = make_group
+        for period, pkey in _periods(day, cache):
+            _cell(tables, period, pkey, "model", model_key, model_label)._merge(day_cell)
+    for period in PERIODS:
+        for pkey, models in tables[(period, "model")].items():
+            for model_key, model_cell in models.items():
+                make_key, make_label = make_of[model_key]
+                _cell(tables, period, pkey, "make", make_key, make_label)._merge(model_cell)
+            for make_cell in tables[(period, "make")][pkey].values():
+                _cell(tables, period, pkey, "all", "", "All Sales")._merge(make_cell)
+    return tables
+
+class RollupRow:
+    """One line of a rollup: a period, a group and its figures."""
+    __slots__ = ("period", "group", "cell")
+
+    def __init__(self, period: str, group: str, cell: RollupCell):
+        self.period = period
+        self.group = group
+        self.cell = cell
+
+    def as_dict(self) -> dict:
+        cell = self.cell
+        return {
+            "period": self.period,
+            "group": self.group,
+            "units": cell.units,
+            "revenue": round(cell.revenue, 2),
+            "cost": round(cell.cost, 2),
+            "profit": round(cell.profit, 2),
+            "margin_pct": round(cell.margin, 2),
+            "median_margin_pct": cell.margin_percentile(0.5),
+        }
+
+CSV_FIELDS = ["period", "group", "units", "revenue", "cost", "profit", "margin_pct", "median_margin_pct"]
+
+def sale_entry(car) -> tuple:
+    """What the tables need to know about one sold car."""
+    return (car.sold_date, car.make, car.model, car.price, car.cost)
+
+class SalesAnalytics:
+    """Precomputed sales rollups for one inventory, kept current through its listener.
+    Use Inventory.analytics rather than creating one directly."""
+    def __init__(self):
+        self._tables = _empty_tables()
+        self._entries: dict[str, tuple] = {}
+        self._period_cache: dict = {}
+
+    @classmethod
+    def from_entries(cls, entries: dict[str, tuple], workers: int | None = None) -> SalesAnalytics:
+        """Builds the tables from {vin: sale_entry(car)} for every sold car. Takes no lock,
+        so the inventory carries on while a long history is totalled; see catch_up."""
+        analytics = cls()
+        analytics._entries = dict(entries)
+        analytics._tables = analytics._build(list(entries.values()), workers)
+        return analytics
+
+    def catch_up(self, inventory, changes):
+        """Applies the changes made to inventory since its sales were copied out, read from
+        the changes subscription. The caller must hold the inventory lock. If too many changes
+        came in to still be in the event log, every car is looked at again instead."""
+        try:
+            while events := changes.poll(max_events=4096):
+                for event in events:
+                    self._on_inventory_change(event.kind, event.car, event.attribute, event.old_value)
+        except EventsLost:
+            for vin in [vin for vin in self._entries if vin not in inventory.cars]:
+                self.forget(vin)
+            for car in list(inventory.cars.values()):
+                self.record(car)
+
+    def _build(self, rows: list[tuple], workers: int | None) -> Tables:
+        workers = workers or os.cpu_count() or 1
+        if len(rows) < PARALLEL_THRESHOLD or workers < 2:
+            return build_tables(total_by_day(rows))
+        size = math.ceil(len(rows) / workers)
+        chunks = [rows[start:start + size] for start in range(0, len(rows), size)]
+        # spawn, not fork: the dealership runs background threads, and forking those is unsafe
+        with ProcessPoolExecutor(len(chunks), mp_context=get_context("spawn")) as pool:
+            partials = list(pool.map(total_by_day, chunks))
+        base = partials[0]
+        for partial in partials[1:]:
+            for key, cell in partial.items():
+                existing = base.get(key)
+                if existing is None:
+                    base[key] = cell
+                else:
+                    existing._merge(cell)
+        return build_tables(base)
+
+    def record(self, car):
+        """Brings the tables up to date with the car's current state."""
+        self.forget(car.vin)
+        if car.status != "Sold":
+            return
+        entry = sale_entry(car)
+        self._entries[car.vin] = entry
+        _apply(self._tables, 1, *entry, self._period_cache)
+
+    def forget(self, vin: str):
+        entry = self._entries.pop(vin, None)
+        if entry is not None:
+            _apply(self._tables, -1, *entry, self._period_cache)
+
+    def _on_inventory_change(self, action, car, attribute, old_value):
+        if action == "removed":
+            self.forget(car.vin)
+        elif action == "added" or attribute in ("status", "sold_date", "price", "cost", "make", "model"):
+            self.record(car)
+
+    def rollup(self, period: str = "month", by: str = "all", start=None, end=None) -> list[RollupRow]:
+        """Rows for every period between start and end (inclusive; period keys like "2025-Q3"
+        or dates, either may be None for open-ended), for each group, in time then group order."""
+        if period not in PERIODS:
+            raise ValueError(f"Period must be one of {', '.join(PERIODS)}.")
+        if by not in GROUPINGS:
+            raise ValueError(f"Sales can be grouped by {', '.join(GROUPINGS)}.")
+        if isinstance(start, date):
+            start = period_key(period, start)
+        if isinstance(end, date):
+            end = period_key(period, end)
+        rows = []
+        for pkey, groups in sorted(list(self._tables[(period, by)].items())):
+            if pkey != UNDATED and ((start and pkey < start) or (end and pkey > end)):
+                continue
+            if pkey == UNDATED and (start or end):
+                continue
+            for cell in sorted(list(groups.values()), key=lambda cell: cell.label.casefold()):
+                rows.append(RollupRow(pkey, cell.label, cell))
+        return rows
+
+    def periods(self, period: str = "month") -> list[str]:
+        """Every period key with sales in it, oldest first."""
+        return sorted(self._tables[(period, "all")])
+
+def write_csv(rows: Iterable[RollupRow], destination) -> int:
+    """Streams rollup rows to a CSV file path or open text file. Returns how many were written."""
+    if isinstance(destination, (str, os.PathLike)):
+        with open(destination, "w", newline="", encoding="utf-8") as f:
+            return write_csv(rows, f)
+    writer = csv.DictWriter(destination, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row.as_dict())
+        count += 1
+    return count
@@ -1,38 +1,140 @@
 # auth.py
-''' The auth module handles user authentication and management for the car dealership system.'''
+''' The auth module handles user authentication and management for the car dealership system.
+ Passwords are stored only as salted PBKDF2 hashes. Checking one is deliberately slow, so checks run
+ on a small worker pool, a successful login hands out a resume code that skips the check on re-entry,
+ and failed attempts are limited per user and per terminal.'''
 from __future__ import annotations
-from typing import Dict, Optional
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from console import input, print
+
+PBKDF2_ITERATIONS = 600_000  # Stored with each hash, so raising it only affects new passwords
+SESSION_SECONDS = 15 * 60  # How long a resume code stays valid
+MAX_FAILURES_PER_TERMINAL = 3
+MAX_FAILURES_PER_USER = 5  # Across all terminals, so guessing cannot be spread over several
+LOCKOUT_SECONDS = 5 * 60
+
+def hash_password(password: str, iterations: int = PBKDF2_ITERATIONS) -> str:
+    """Returns "pbkdf2_sha256$iterations$salt$hash" for password, with a fresh random salt."""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Checks password against a hash made by hash_password, in constant time."""
+    try:
+        algorithm, iterations, salt, expected = encoded.split("$")
+    except ValueError:
+        return False
+    if algorithm != "pbkdf2_sha256":
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
 
 class User:
     """Represents a user in the system with a specific role."""
-    def __init__(self, username: str, password: str, role: str):
+    def __init__(self, username: str, password: Optional[str], role: str, password_hash: Optional[str] = None):
+        if not password_hash and not password:
+            raise ValueError(f"User '{username}' needs a password or a password hash.")
         self.username = username
-        self.password = password
+        self.password_hash = password_hash or hash_password(password)
         self.role_type = role
         self.full_name: Optional[str] = None
 
-    def login(self) -> Optional[str]:
-        """Prompts for a password and validates it, returning the user's role on success."""
-        pw = input(f"Password for {self.username}: ").strip()
-        if pw == self.password:
-            print(f"Welcome, {self.role_type} {self.username}!")
-            if self.role_type == "Buyer" and not self.full_name:
-                self.full_name = input("Please enter your full name for the order: ").strip().title()
-            return self.role_type
-        else:
-            print("Invalid credentials.")
-            return None
+    def to_record(self) -> dict:
+        return {"username": self.username, "password_hash": self.password_hash, "role": self.role_type, "full_name": self.full_name}
+
+    @classmethod
+    def from_record(cls, record: dict) -> User:
+        # Records saved before hashing hold a plaintext "password"; it is hashed as it is loaded
+        user = cls(record["username"], record.get("password"), record["role"], record.get("password_hash"))
+        user.full_name = record.get("full_name")
+        return user
+
+    def check_password(self, password: str) -> bool:
+        return verify_password(password, self.password_hash)
+
+class LoginThrottle:
+    """Counts failed logins per key (a user or a terminal) over a sliding window."""
+    def __init__(self, window: float = LOCKOUT_SECONDS, clock=time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._failures: dict[tuple[str, str], deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, key: tuple[str, str], now: float) -> deque[float]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return deque()
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+        return failures
+
+    def locked_for(self, key: tuple[str, str], limit: int) -> float:
+        """Seconds until key may try again, or 0 if it is not locked out."""
+        with self._lock:
+            now = self._clock()
+            failures = self._recent(key, now)
+            if len(failures) < limit:
+                return 0.0
+            return failures[-limit] + self.window - now
+
+    def count(self, key: tuple[str, str]) -> int:
+        with self._lock:
+            return len(self._recent(key, self._clock()))
+
+    def failed(self, *keys: tuple[str, str]):
+        with self._lock:
+            now = self._clock()
+            for key in keys:
+                self._recent(key, now)
+                self._failures.setdefault(key, deque()).append(now)
+
+    def clear(self, key: tuple[str, str]):
+        with self._lock:
+            self._failures.pop(key, None)
 
 class UserManager:
     """Manages all user-related operations, including authentication."""
-    def __init__(self):
+    def __init__(self, verify_workers: Optional[int] = None, hash_iterations: int = PBKDF2_ITERATIONS):
+        """hash_iterations sets the cost of the decoy hash checked for unknown usernames;
+        keep it equal to the cost of the stored passwords so neither check stands out."""
         self._users: Dict[str, User] = {}
+        self._listeners: list[Callable[[str, User], None]] = []
+        self._lock = threading.Lock() # Several terminals may create users at once
+        self.throttle = LoginThrottle()
+        self._sessions: Dict[str, tuple[str, float]] = {} # resume code -> (username, expiry)
+        # Hashing releases the GIL, so these checks run truly in parallel, but never more than the CPUs can take
+        self._verify_workers = verify_workers or os.cpu_count() or 2
+        self._verifier: Optional[ThreadPoolExecutor] = None
+        self._decoy_hash: Optional[str] = None
+        self._hash_iterations = hash_iterations
+
+    def add_listener(self, callback: Callable[[str, User], None]):
+        """Registers callback(action, user), called after a user is "added" or has their "role_changed"
+        or "name_changed"."""
+        self._listeners.append(callback)
+
+    def _emit(self, action: str, user: User):
+        for callback in self._listeners:
+            callback(action, user)
 
     def add_user(self, user: User):
         """Adds a new user to the manager."""
-        if user.username.lower() in self._users:
-            raise ValueError(f"User '{user.username}' already exists.")
-        self._users[user.username.lower()] = user
+        with self._lock:
+            if user.username.lower() in self._users:
+                raise ValueError(f"User '{user.username}' already exists.")
+            self._users[user.username.lower()] = user
+        self._emit("added", user)
 
     def get_user(self, username: str) -> Optional[User]:
         """Retrieves a user by their username."""
@@ -42,6 +144,84 @@ class UserManager:
         """Returns a list of all users."""
         return list(self._users.values())
 
+    def _verify(self, user: Optional[User], password: str) -> bool:
+        """Runs the password check on the worker pool. Unknown users are checked against a decoy
+        hash so that a wrong username takes as long as a wrong password."""
+        with self._lock:
+            if self._verifier is None:
+                self._verifier = ThreadPoolExecutor(self._verify_workers, thread_name_prefix="password-check")
+            if self._decoy_hash is None:
+                self._decoy_hash = hash_password(secrets.token_hex(8), self._hash_iterations)
+        encoded = user.password_hash if user else self._decoy_hash
+        matched = self._verifier.submit(verify_password, password, encoded).result()
+        return matched and user is not None
+
+    def lockout_remaining(self, username: Optional[str] = None, terminal: Optional[str] = None) -> float:
+        """Seconds before this user or terminal may try to log in again; 0 if they may now."""
+        remaining = 0.0
+        if terminal is not None:
+            remaining = self.throttle.locked_for(("terminal", terminal), MAX_FAILURES_PER_TERMINAL)
+        if username is not None:
+            remaining = max(remaining, self.throttle.locked_for(("user", username.lower()), MAX_FAILURES_PER_USER))
+        return remaining
+
+    def attempts_remaining(self, username: str, terminal: str = "local") -> int:
+        """Failed logins this user and terminal may still make before being locked out."""
+        return min(MAX_FAILURES_PER_TERMINAL - self.throttle.count(("terminal", terminal)),
+                   MAX_FAILURES_PER_USER - self.throttle.count(("user", username.lower())))
+
+    def authenticate(self, username: str, password: str, terminal: str = "local") -> Optional[User]:
+        """Checks a username and password, returning the user on success.
+        Returns None on a wrong password and also, without checking, while the user or terminal is locked out."""
+        if self.lockout_remaining(username, terminal):
+            return None
+        user = self.get_user(username)
+        if self._verify(user, password):
+            self.throttle.clear(("user", username.lower()))
+            self.throttle.clear(("terminal", terminal))
+            return user
+        self.throttle.failed(("user", username.lower()), ("terminal", terminal))
+        return None
+
+    def login(self, username: str, terminal: str = "local") -> Optional[User]:
+        """Prompts for the password of username and returns the user if it is correct."""
+        pw = input(f"Password for {username}: ").strip()
+        user = self.authenticate(username, pw, terminal)
+        if user is None:
+            print("Invalid credentials.")
+            return None
+        print(f"Welcome, {user.role_type} {user.username}!")
+        if user.role_type == "Buyer" and not user.full_name:
+            self.update_full_name(user, input("Please enter your full name for the order: ").strip().title())
+        return user
+
+    def start_session(self, user: User) -> str:
+        """Issues a resume code that logs user back in without a password until it expires."""
+        token = secrets.token_urlsafe(12)
+        with self._lock:
+            now = time.monotonic()
+            # Expired codes are swept here rather than on a timer; there is one per recent login at most
+            for stale in [code for code, (_, expires_at) in self._sessions.items() if expires_at <= now]:
+                del self._sessions[stale]
+            self._sessions[token] = (user.username.lower(), now + SESSION_SECONDS)
+        return token
+
+    def resume_session(self, token: str) -> Optional[User]:
+        """Returns the user a still-valid resume code belongs to, or None."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            username, expires_at = session
+            if expires_at <= time.monotonic():
+                del self._sessions[token]
+                return None
+        return self.get_user(username)
+
+    def end_session(self, token: Optional[str]):
+        with self._lock:
+            self._sessions.pop(token, None)
+
     def update_user_role(self, username: str, new_role: str) -> bool:
         """Updates the role of a specified user."""
         user = self.get_user(username)
@@ -54,9 +234,15 @@ class UserManager:
             return False
             
         user.role_type = new_role
+        self._emit("role_changed", user)
         print(f"User '{username}' role updated to '{new_role}'.")
         return True
 
+    def update_full_name(self, user: User, full_name: str):
+        """Sets the name orders are addressed to."""
+        user.full_name = full_name
+        self._emit("name_changed", user)
+
     def create_user(self, username: str, password: str, role: str) -> bool:
         """Creates a new user and adds them to the manager."""
         if self.get_user(username):
@@ -66,6 +252,10 @@ class UserManager:
         if role not in ["Admin", "Seller", "Buyer"]:
             print(f"Error: Invalid role '{role}'.")
             return False
+
+        if not password:
+            print("Error: A password is required.")
+            return False
             
         new_user = User(username, password, role)
         self.add_user(new_user)
@@ -0,0 +1,57 @@
+# benchmarks/car_memory.py
+""" Measures how many bytes each Car costs when a lot holds 100k and 1M cars.
+    Makes, models and colours are built fresh for every car, the same way text typed
+    at the terminal arrives, so string sharing only happens if Car does it itself.
+
+    Run from the project root: python benchmarks/car_memory.py [count ...]
+
+    Measured on Python 3.11, Linux x86-64, including the VIN string. The cars are never
+    added to a lot, so no VIN directory entry is counted. The first two rows date from
+    when every Car also registered its VIN in a class-wide registry:
+                            100k cars    1M cars
+      dict-backed             498.6       491.3   bytes per car
+      slotted                 312.5       305.2   bytes per car
+      slotted, no registry    298.1       298.5   bytes per car (incl. the row cache slots)
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from car import Car
+
+MAKES = [("Toyota", ["Camry", "Corolla", "RAV4"]), ("Honda", ["Civic", "Accord"]), ("Ford", ["F-150", "Mustang"])]
+COLOURS = ["Silver", "Black", "White", "Blue", "Red"]
+
+def fresh(text: str) -> str:
+    """Returns an equal but separately allocated copy of text."""
+    return "".join(list(text))
+
+def bytes_per_car(count: int) -> float:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    cars = []
+    for i in range(count):
+        make, models = MAKES[i % len(MAKES)]
+        cars.append(Car(
+            vin=f"1HGCM{i:012d}",
+            year=2015 + i % 10,
+            make=fresh(make),
+            model=fresh(models[i % len(models)]),
+            colour=fresh(COLOURS[i % len(COLOURS)]),
+            cost=20000.0 + i % 5000,
+            price=25000.0 + i % 5000,
+        ))
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cars
+    return (after - before) / count
+
+def main(argv: list[str]):
+    counts = [int(arg) for arg in argv] or [100_000, 1_000_000]
+    for count in counts:
+        print(f"{count:>9,} cars: {bytes_per_car(count):,.1f} bytes per car")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
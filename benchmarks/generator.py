@@ -0,0 +1,86 @@
+# benchmarks/generator.py
+""" Builds large, repeatable synthetic inventories for benchmarks and load tests.
+    The same seed always produces the same cars. Makes and models follow a skewed
+    popularity curve, like a real lot, and every VIN is 17 characters with a
+    valid check digit and a unique serial number."""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from car import Car
+from inventory import Inventory
+
+# (make, world manufacturer identifier, popularity weight, [(model, base price)])
+MAKES = [
+    ("Toyota", "JT2", 30, [("Camry", 28000), ("Corolla", 22000), ("RAV4", 31000), ("Tacoma", 36000), ("Highlander", 42000)]),
+    ("Ford", "1FA", 24, [("F-150", 45000), ("Escape", 29000), ("Mustang", 38000), ("Explorer", 40000)]),
+    ("Honda", "1HG", 20, [("Civic", 24000), ("Accord", 29000), ("CR-V", 32000), ("Pilot", 41000)]),
+    ("Chevrolet", "1G1", 14, [("Silverado", 44000), ("Equinox", 28000), ("Malibu", 25000)]),
+    ("Nissan", "1N4", 9, [("Altima", 26000), ("Rogue", 29000), ("Sentra", 21000)]),
+    ("Hyundai", "KMH", 7, [("Elantra", 22000), ("Tucson", 29000), ("Santa Fe", 34000)]),
+    ("Kia", "KNA", 5, [("Sportage", 28000), ("Sorento", 33000), ("Forte", 21000)]),
+    ("Subaru", "JF1", 4, [("Outback", 31000), ("Forester", 30000), ("Crosstrek", 27000)]),
+    ("BMW", "WBA", 3, [("3 Series", 46000), ("X5", 66000)]),
+    ("Tesla", "5YJ", 2, [("Model 3", 42000), ("Model Y", 48000)]),
+]
+COLOURS = ["White", "Black", "Silver", "Grey", "Blue", "Red", "Green", "Brown"]
+COLOUR_WEIGHTS = [25, 22, 16, 15, 10, 8, 2, 2]
+
+VIN_ALPHABET = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"  # VINs never use I, O or Q
+YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"  # Model years 2010 onwards
+_TRANSLITERATION = {
+    **{str(digit): digit for digit in range(10)},
+    **dict(zip("ABCDEFGH", range(1, 9))), **dict(zip("JKLMN", range(1, 6))), "P": 7, "R": 9,
+    **dict(zip("STUVWXYZ", range(2, 10))),
+}
+_WEIGHTS = [8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2]
+
+def vin_check_digit(vin: str) -> str:
+    """Returns the check digit (position 9) for a 17-character VIN."""
+    total = sum(_TRANSLITERATION[char] * weight for char, weight in zip(vin, _WEIGHTS))
+    remainder = total % 11
+    return "X" if remainder == 10 else str(remainder)
+
+def make_vin(rng: random.Random, wmi: str, year: int, serial: int) -> str:
+    descriptor = "".join(rng.choice(VIN_ALPHABET) for _ in range(5))
+    plant = VIN_ALPHABET[serial // 1_000_000 % len(VIN_ALPHABET)]
+    vin = f"{wmi}{descriptor}0{YEAR_CODES[(year - 2010) % len(YEAR_CODES)]}{plant}{serial % 1_000_000:06d}"
+    return vin[:8] + vin_check_digit(vin) + vin[9:]
+
+def generate_records(count: int, seed: int = 42, sold_fraction: float = 0.2):
+    """Yields count car records as dicts with keys matching Car plus a "sold" flag."""
+    rng = random.Random(seed)
+    make_weights = [weight for _, _, weight, _ in MAKES]
+    for serial in range(count):
+        make, wmi, _, models = rng.choices(MAKES, weights=make_weights)[0]
+        # Earlier models in each list sell more, so models are skewed as well
+        model, base_price = rng.choices(models, weights=range(len(models), 0, -1))[0]
+        year = rng.randint(2012, 2025)
+        price = round(base_price * (0.55 + 0.03 * (year - 2012)) * rng.uniform(0.9, 1.1), -1)
+        cost = round(price / rng.uniform(1.12, 1.30), 2)
+        yield {
+            "vin": make_vin(rng, wmi, year, serial),
+            "year": year,
+            "make": make,
+            "model": model,
+            "colour": rng.choices(COLOURS, weights=COLOUR_WEIGHTS)[0],
+            "cost": cost,
+            "price": price,
+            "sold": rng.random() < sold_fraction,
+        }
+
+def generate_cars(count: int, seed: int = 42, sold_fraction: float = 0.2):
+    """Yields count new Car objects; roughly sold_fraction of them are already sold."""
+    for record in generate_records(count, seed, sold_fraction):
+        sold = record.pop("sold")
+        car = Car(**record)
+        if sold:
+            car.sell()
+        yield car
+
+def generate_inventory(count: int, seed: int = 42, sold_fraction: float = 0.2, columnar: bool = False) -> Inventory:
+    inventory = Inventory(columnar=columnar)
+    inventory.add_cars(generate_cars(count, seed, sold_fraction))
+    return inventory
@@ -0,0 +1,407 @@
+# benchmarks/load_sim.py
+""" Simulates a busy showroom: many buyers and sellers working on one shared
+    Inventory and UserManager at the same time, each on its own thread like a
+    server session. Buyers browse, filter, add cars to a cart and check out;
+    sellers reprice, reserve and release cars. Payment, delivery and notification
+    are mocked, so the run measures the dealership itself rather than prompts,
+    and nothing is written to disk.
+
+    The same workload is run at each --scale multiple of the base populations,
+    on a freshly generated lot each time, to show how throughput, latency and the
+    rate of conflicts (another terminal got the car first) change with concurrency.
+
+    Run from the project root:
+      python benchmarks/load_sim.py --buyers 8 --sellers 2 --scale 1 2 4 --duration 5
+      python benchmarks/load_sim.py --buyer-mix browse=1,filter=1,add_to_cart=2,checkout=1 --output load.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from car import PermissionError, VINDirectory
+from inventory import Inventory
+from auth import User, UserManager, hash_password, PBKDF2_ITERATIONS
+from console import Console, use_console
+from ecommerce import Cart
+from fulfilment import new_order
+from instrumentation import LatencyHistogram
+from generator import generate_cars, MAKES
+
+OK, CONFLICT, REJECTED, FAILED, ERROR = "ok", "conflict", "rejected", "failed", "error"
+OUTCOMES = (OK, CONFLICT, REJECTED, FAILED, ERROR)
+BUYER_MIX = {"browse": 40, "filter": 30, "add_to_cart": 20, "checkout": 10}
+SELLER_MIX = {"reprice": 60, "reserve": 25, "release": 15}
+PAGE_SIZE = 10
+MAX_CART = 3  # A buyer with this many cars checks out instead of adding another
+PASSWORD = "load-sim"
+
+class QuietConsole(Console):
+    """Swallows the menus' output; a simulated terminal has nobody to show it to."""
+    def input(self, prompt: str = "") -> str:
+        raise EOFError("Simulated terminals do not answer prompts.")
+
+    def write(self, text: str):
+        pass
+
+# ---------------- Mocked services ----------------
+
+class MockPayment:
+    """Stands in for ecommerce.Payment: approves the charge unless it randomly declines it."""
+    def __init__(self, decline_rate: float, rng: random.Random):
+        self.decline_rate = decline_rate
+        self.rng = rng
+
+    def process(self, total: float) -> bool:
+        return self.rng.random() >= self.decline_rate
+
+class MockDelivery:
+    @staticmethod
+    def schedule() -> dict:
+        return {"address": "1 Simulation Way", "date": "2025-01-01"}
+
+class MockNotification:
+    """Counts confirmations instead of queueing emails and delivery bookings."""
+    def __init__(self):
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def send_order_confirmation(self, user: User, order: dict, delivery: dict | None = None):
+        with self._lock:
+            self.sent += 1
+
+# ---------------- Results ----------------
+
+class StageStats:
+    """Latency histograms and outcome counts per action, shared by every actor of one stage."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: dict[str, LatencyHistogram] = {}
+        self.outcomes: dict[str, dict[str, int]] = {}
+        self.first_errors: dict[str, str] = {}  # action -> traceback of its first unexpected exception
+
+    def record_error(self, action: str):
+        """Keeps and prints the traceback of the exception being handled, if it is the
+        first for action; later ones are only counted, so a broken action cannot flood the output."""
+        with self._lock:
+            if action in self.first_errors:
+                return
+            self.first_errors[action] = traceback.format_exc()
+        print(f"Unexpected error in {action} (later ones are only counted):\n{self.first_errors[action]}",
+              file=sys.stderr)
+
+    def record(self, action: str, outcome: str, seconds: float):
+        with self._lock:
+            histogram = self.latencies.get(action)
+            if histogram is None:
+                histogram = self.latencies[action] = LatencyHistogram()
+                self.outcomes[action] = dict.fromkeys(OUTCOMES, 0)
+            histogram.record(seconds)
+            self.outcomes[action][outcome] += 1
+
+    def total(self, outcome: str | None = None, skip: tuple[str, ...] = ("login",)) -> int:
+        return sum(counts[outcome] if outcome else sum(counts.values())
+                   for action, counts in self.outcomes.items() if action not in skip)
+
+# ---------------- Actors ----------------
+
+class Actor:
+    """One simulated terminal. Logs in, waits for the start signal, then performs
+    actions picked from its mix until the stage ends, pausing a random think time
+    (averaging 1 / rate seconds) between them."""
+    def __init__(self, simulation, name: str, role: str, mix: dict[str, float], rate: float, seed: str):
+        self.sim = simulation
+        self.name = name
+        self.role = role
+        self.rng = random.Random(seed)
+        self.rate = rate
+        self.actions = list(mix)
+        self.weights = list(mix.values())
+        self.user = None
+
+    def run(self, start: threading.Barrier, stop: threading.Event):
+        use_console(QuietConsole())
+        try:
+            self.login()
+        except BaseException:
+            start.abort() # Nobody else would ever get past the start line
+            raise
+        try:
+            start.wait()
+        except threading.BrokenBarrierError:
+            return # Another actor failed to log in; the stage is called off
+        try:
+            while not stop.is_set():
+                action = self.rng.choices(self.actions, weights=self.weights)[0]
+                self.perform(action)
+                if self.rate > 0:
+                    stop.wait(self.rng.expovariate(self.rate))
+        finally:
+            self.leave()
+
+    def login(self):
+        started = time.perf_counter()
+        self.user = self.sim.user_manager.authenticate(self.name, PASSWORD, terminal=self.name)
+        self.sim.stats.record("login", OK if self.user else FAILED, time.perf_counter() - started)
+
+    def perform(self, action: str):
+        started = time.perf_counter()
+        try:
+            action, outcome = getattr(self, action)()
+        except Exception:
+            self.sim.stats.record_error(action)
+            outcome = ERROR
+        self.sim.stats.record(action, outcome, time.perf_counter() - started)
+
+    def leave(self):
+        pass
+
+    def random_car(self):
+        return self.sim.inventory.find_car(self.rng.choice(self.sim.vins))
+
+class Buyer(Actor):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.cart = None
+        self.seen = []
+        self.payment = MockPayment(self.sim.decline_rate, self.rng)
+
+    def login(self):
+        super().login()
+        self.cart = Cart(self.user, self.sim.inventory.holds)
+
+    def leave(self):
+        self.cart.clear() # Puts any cars still held back on sale for the next stage
+
+    def browse(self):
+        cursor = self.rng.choice(self.sim.vins) if self.rng.random() < 0.8 else None
+        self.sim.inventory.render_page(PAGE_SIZE, cursor)
+        return "browse", OK
+
+    def filter(self):
+        make = self.rng.choices(self.sim.makes, weights=self.sim.make_weights)[0]
+        max_price = self.rng.choice((None, 25_000, 35_000, 50_000))
+        self.seen = self.sim.inventory.query(make=make, max_price=max_price, sort_by="price", limit=20)
+        return "filter", OK
+
+    def add_to_cart(self):
+        if len(self.cart.items) >= MAX_CART:
+            return self.checkout()
+        # Shoppers mostly pick from what they just searched for, so the cheapest cars are contested
+        car = self.rng.choice(self.seen) if self.seen else self.random_car()
+        if car is None:
+            return "add_to_cart", CONFLICT
+        self.cart.add_item(car)
+        return "add_to_cart", OK if self.cart.is_holding(car.vin) else CONFLICT
+
+    def checkout(self):
+        """The steps of main.handle_checkout, with the prompts replaced by the mocks."""
+        if not self.cart.items:
+            return self.add_to_cart()
+        _, total = self.cart.calculate_total()
+        if not self.payment.process(total):
+            return "checkout", FAILED
+        try:
+            self.sim.inventory.checkout(self.cart.items, holder=self.cart)
+        except ValueError:
+            for vin, car in list(self.cart.items.items()):
+                if not (car.is_available() or self.cart.is_holding(vin)):
+                    self.cart.remove_item(vin)
+            return "checkout", CONFLICT
+        order = new_order(self.user.username, self.cart.items.values(), total)
+        self.sim.notification.send_order_confirmation(self.user, order, MockDelivery.schedule())
+        self.cart.clear()
+        self.cart = Cart(self.user, self.sim.inventory.holds)
+        return "checkout", OK
+
+class Seller(Actor):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.reserved = []
+
+    def leave(self):
+        for car in self.reserved:
+            if car.status == "Reserved":
+                car.mark_available()
+
+    def reprice(self):
+        car = self.random_car()
+        if car is None:
+            return "reprice", CONFLICT
+        try:
+            car.update_price(round(car.price * self.rng.uniform(0.95, 1.05), -1))
+        except PermissionError:
+            return "reprice", REJECTED # Would break the minimum profit margin
+        return "reprice", OK
+
+    def reserve(self):
+        car = self.random_car()
+        if car is None:
+            return "reserve", CONFLICT
+        try:
+            car.reserve()
+        except ValueError:
+            return "reserve", CONFLICT # Sold, held in a cart or reserved by someone else
+        self.reserved.append(car)
+        return "reserve", OK
+
+    def release(self):
+        if not self.reserved:
+            return self.reserve()
+        car = self.reserved.pop(self.rng.randrange(len(self.reserved)))
+        if car.status != "Reserved":
+            return "release", CONFLICT
+        car.mark_available()
+        return "release", OK
+
+# ---------------- Simulation ----------------
+
+class Simulation:
+    """One stage: a fresh lot, the given populations, run for duration seconds."""
+    def __init__(self, cars: int, seed: int, password_hash: str, hash_iterations: int, decline_rate: float):
+        self.seed = seed
+        self.decline_rate = decline_rate
+        self.password_hash = password_hash
+        # A directory of its own, so each stage can regenerate the same VINs
+        self.inventory = Inventory(name="Simulated Lot", directory=VINDirectory())
+        self.inventory.add_cars(generate_cars(cars, seed))
+        self.vins = list(self.inventory.cars)
+        self.makes = [make for make, _, _, _ in MAKES]
+        self.make_weights = [weight for _, _, weight, _ in MAKES]
+        self.user_manager = UserManager(hash_iterations=hash_iterations)
+        self.notification = MockNotification()
+        self.stats = StageStats()
+
+    def _actors(self, role: str, count: int, actor_class, mix: dict[str, float], rate: float) -> list[Actor]:
+        actors = []
+        for i in range(count):
+            name = f"{role.lower()}{i:03d}"
+            self.user_manager.add_user(User(name, None, role, password_hash=self.password_hash))
+            # A string seed, unlike hash(), gives the same sequence in every run (see PYTHONHASHSEED)
+            actors.append(actor_class(self, name, role, mix, rate, f"{self.seed}:{name}"))
+        return actors
+
+    def run(self, buyers: int, sellers: int, buyer_mix, seller_mix, buyer_rate: float, seller_rate: float,
+            duration: float) -> dict:
+        actors = (self._actors("Buyer", buyers, Buyer, buyer_mix, buyer_rate)
+                  + self._actors("Seller", sellers, Seller, seller_mix, seller_rate))
+        start = threading.Barrier(len(actors) + 1) # Logins are slow on purpose; the clock starts once all are in
+        stop = threading.Event()
+        threads = [threading.Thread(target=actor.run, args=(start, stop), name=actor.name, daemon=True)
+                   for actor in actors]
+        for thread in threads:
+            thread.start()
+        try:
+            start.wait()
+        except threading.BrokenBarrierError:
+            for thread in threads:
+                thread.join()
+            raise RuntimeError("A simulated terminal failed to log in; see its traceback above.") from None
+        began = time.perf_counter()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        return self.summary(buyers, sellers, elapsed)
+
+    def summary(self, buyers: int, sellers: int, elapsed: float) -> dict:
+        stats = self.stats
+        operations = stats.total()
+        actions = {}
+        for action, histogram in stats.latencies.items():
+            actions[action] = {**histogram.summary(), **stats.outcomes[action]}
+        return {
+            "buyers": buyers,
+            "sellers": sellers,
+            "duration_s": round(elapsed, 3),
+            "operations": operations,
+            "throughput_ops_s": round(operations / elapsed, 1) if elapsed else 0.0,
+            "conflict_rate": round(stats.total(CONFLICT) / operations, 4) if operations else 0.0,
+            "failure_rate": round((stats.total(FAILED) + stats.total(ERROR)) / operations, 4) if operations else 0.0,
+            "errors": stats.total(ERROR),
+            "first_errors": stats.first_errors,
+            "orders": self.notification.sent,
+            # Every cart and seller lets go of its cars when the stage ends, so this should be 0
+            "left_reserved": sum(1 for car in list(self.inventory.cars.values()) if car.status == "Reserved"),
+            "actions": actions,
+        }
+
+def parse_mix(text: str, defaults: dict[str, float]) -> dict[str, float]:
+    """Reads a mix like "browse=4,filter=3" into weights. Actions left out keep no weight."""
+    mix = {}
+    for part in text.split(","):
+        action, _, weight = part.partition("=")
+        action = action.strip()
+        if action not in defaults:
+            raise argparse.ArgumentTypeError(f"Unknown action '{action}'. Choose from {', '.join(defaults)}.")
+        try:
+            mix[action] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Weight for '{action}' must be a number.") from None
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("At least one action needs a weight above 0.")
+    return mix
+
+def print_stage(result: dict):
+    print(f"\n{result['buyers']} buyers, {result['sellers']} sellers: {result['operations']:,} operations in "
+          f"{result['duration_s']:.1f} s = {result['throughput_ops_s']:,.0f} ops/s, "
+          f"{result['conflict_rate']:.1%} conflicts, {result['failure_rate']:.1%} failures, {result['orders']:,} orders")
+    if result["left_reserved"]:
+        print(f"  Warning: {result['left_reserved']} car(s) were still reserved after every terminal left.")
+    print(f"  {'Action':<13}{'Calls':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'Conflict':>10}{'Rejected':>10}{'Failed':>8}{'Error':>7}")
+    for action, row in result["actions"].items():
+        print(f"  {action:<13}{row['calls']:>8}{row['p50_ms']:>11.3f}{row['p95_ms']:>11.3f}{row['p99_ms']:>11.3f}"
+              f"{row[CONFLICT]:>10}{row[REJECTED]:>10}{row[FAILED]:>8}{row[ERROR]:>7}")
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Simulate many concurrent buyers and sellers.")
+    parser.add_argument("--cars", type=int, default=20_000, help="Cars in the generated lot")
+    parser.add_argument("--buyers", type=int, default=8, help="Buyers at scale 1")
+    parser.add_argument("--sellers", type=int, default=2, help="Sellers at scale 1")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 2, 4], help="Population multiples to run, in order")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds each stage runs after everyone has logged in")
+    parser.add_argument("--buyer-rate", type=float, default=20.0, help="Actions per second per buyer (0: no think time)")
+    parser.add_argument("--seller-rate", type=float, default=5.0, help="Actions per second per seller (0: no think time)")
+    parser.add_argument("--buyer-mix", type=lambda text: parse_mix(text, BUYER_MIX), default=BUYER_MIX,
+                        help="Relative weights, e.g. browse=40,filter=30,add_to_cart=20,checkout=10")
+    parser.add_argument("--seller-mix", type=lambda text: parse_mix(text, SELLER_MIX), default=SELLER_MIX,
+                        help="Relative weights, e.g. reprice=60,reserve=25,release=15")
+    parser.add_argument("--decline-rate", type=float, default=0.02, help="Share of mock payments declined")
+    parser.add_argument("--hash-iterations", type=int, default=PBKDF2_ITERATIONS,
+                        help="PBKDF2 iterations for the simulated accounts; lower it to shorten the login phase")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    password_hash = hash_password(PASSWORD, args.hash_iterations) # Hashed once, shared by every account
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "cars": args.cars,
+        "stages": [],
+    }
+    for scale in args.scale:
+        simulation = Simulation(args.cars, args.seed, password_hash, args.hash_iterations, args.decline_rate)
+        result = simulation.run(args.buyers * scale, args.sellers * scale, args.buyer_mix, args.seller_mix,
+                                args.buyer_rate, args.seller_rate, args.duration)
+        print_stage(result)
+        report["stages"].append(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report, indent=2) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# benchmarks/run.py
+""" Times the dealership's hot paths against generated inventories and prints JSON.
+    Save the output from two runs and compare them to see what an upgrade changed.
+
+    Run from the project root:
+      python benchmarks/run.py --sizes 10000 100000 --repeat 3 --output before.json
+      python benchmarks/run.py --columnar --output columnar.json   (the same, with the NumPy columnar copy)
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import date, datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from car import Car, VINDirectory
+from inventory import Inventory
+from reprice import RepriceRule
+from ecommerce import Cart
+from auth import User
+import main as dealership
+from generator import generate_records, MAKES, VIN_ALPHABET
+
+QUERIES = 1000  # Lookups timed per repeat for the read-only benchmarks
+
+def _typo(rng: random.Random, vin: str) -> str:
+    """Changes one character, the kind of slip a salesperson makes at the keyboard."""
+    position = rng.randrange(len(vin))
+    return vin[:position] + rng.choice(VIN_ALPHABET) + vin[position + 1:]
+
+def _timed(function, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def run_size(size: int, repeat: int, seed: int, columnar: bool = False) -> list[dict]:
+    results = []
+    rng = random.Random(seed)
+
+    def record(name: str, ops: int, timings: list[float]):
+        best = min(timings)
+        results.append({
+            "benchmark": name,
+            "size": size,
+            "ops": ops,
+            "best_s": round(best, 6),
+            "mean_s": round(sum(timings) / len(timings), 6),
+            "per_op_us": round(best / ops * 1e6, 3),
+        })
+
+    records = list(generate_records(size, seed))
+    for record_ in records:
+        record_.pop("sold")
+
+    # Each repeat builds its own cars and lot from scratch
+    construct_timings, add_timings = [], []
+    inventory = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cars = [Car(**fields) for fields in records]
+        construct_timings.append(time.perf_counter() - start)
+
+        inventory = Inventory(columnar=columnar, directory=VINDirectory()) # Each run registers the same VINs afresh
+        start = time.perf_counter()
+        for car in cars:
+            inventory.add_car(car)
+        add_timings.append(time.perf_counter() - start)
+    record("Car()", size, construct_timings)
+    record("Inventory.add_car", size, add_timings)
+
+    for car in rng.sample(list(inventory.cars.values()), size // 5):
+        car.sell()
+
+    vins = [fields["vin"] for fields in records]
+    lookups = [rng.choice(vins) for _ in range(QUERIES)]
+    typos = [_typo(rng, vin) for vin in lookups[:QUERIES // 10]]
+    price_ranges = [sorted((rng.uniform(15000, 60000), rng.uniform(15000, 60000))) for _ in range(QUERIES // 10)]
+    make_models = []
+    for _ in range(QUERIES // 10):
+        make, _, _, models = rng.choice(MAKES)
+        make_models.append((make, rng.choice(models)[0]))
+
+    record("Inventory.find_car", len(lookups), _timed(lambda: [inventory.find_car(vin) for vin in lookups], repeat))
+    record("Inventory.find_car_by_vin_fuzzy", len(typos),
+           _timed(lambda: [inventory.find_car_by_vin_fuzzy(vin, max_distance=3) for vin in typos], repeat))
+    record("Inventory.filter_by_price_range", len(price_ranges),
+           _timed(lambda: [inventory.filter_by_price_range(low, high) for low, high in price_ranges], repeat))
+    record("Inventory.find_car_by_make_and_model", len(make_models),
+           _timed(lambda: [inventory.find_car_by_make_and_model(make, model) for make, model in make_models], repeat))
+    combined = [dict(make=make, min_year=2018, max_price=high, sort_by="price", limit=20)
+                for (make, _), (_, high) in zip(make_models, price_ranges)]
+    record("Inventory.query", len(combined), _timed(lambda: [inventory.query(**criteria) for criteria in combined], repeat))
+    # Broad searches no single index narrows much; with --columnar these run on the NumPy columns
+    broad = [dict(min_year=2016, max_year=2020, colour=colour, status=status)
+             for colour in ("Black", "White", "Silver") for status in ("Available", "Sold")]
+    record("Inventory.query (broad)", len(broad), _timed(lambda: [inventory.query(**criteria) for criteria in broad], repeat))
+    month_start = date.today().replace(day=1)
+    record("Inventory.sales_totals (dated)", 1, _timed(lambda: inventory.sales_totals(month_start, date.today()), repeat))
+    record("Inventory.page_inventory", 100, _timed(lambda: [inventory.page_inventory() for _ in range(100)], repeat))
+    record("Inventory.list_inventory", 1, _timed(lambda: inventory.list_inventory(include_sold=True), repeat))
+    unsold = [car for car in inventory.cars.values() if car.status != "Sold"]
+    def list_after_change():
+        car = rng.choice(unsold)
+        car.update_price(car.price + 1, admin=True) # Only this row is formatted again; the rest reuse Car's cached text
+        inventory.list_inventory(include_sold=True)
+    record("Inventory.list_inventory after a change", 1, _timed(list_after_change, repeat))
+    markdown = RepriceRule("percent", -1)
+    marked_down = len(inventory.query(make=make_models[0][0]))
+    record("Inventory.bulk_reprice", max(marked_down, 1),
+           _timed(lambda: inventory.bulk_reprice(markdown, make=make_models[0][0]), repeat))
+
+    cart = Cart(User("bench", "bench", "Buyer"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for car in inventory.cheapest_cars(5):
+            cart.add_item(car)
+        cart.apply_discount("SAVE10")
+    record("Cart.calculate_total", QUERIES, _timed(lambda: [cart.calculate_total() for _ in range(QUERIES)], repeat))
+
+    def reports():
+        with contextlib.redirect_stdout(io.StringIO()):
+            dealership.handle_reports(inventory)
+    record("main.handle_reports", 1, _timed(reports, repeat))
+
+    return results
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Benchmark the dealership's hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="Inventory sizes to test")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the best run is reported")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON here instead of to stdout")
+    parser.add_argument("--columnar", action="store_true", help="Build the inventories with the NumPy columnar copy")
+    args = parser.parse_args(argv)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "columnar": args.columnar,
+        "results": [],
+    }
+    for size in args.sizes:
+        report["results"].extend(run_size(size, args.repeat, args.seed, args.columnar))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
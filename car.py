@@ -1,12 +1,31 @@
 # car.py
 """The car module defines the Car class and related functionality for managing each individual car in the dealership inventory.
  It also includes custom management for car status and pricing rules."""
+import sys
+import threading
+import weakref
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import date
-from typing import Optional, ClassVar, Dict, Literal
+from typing import Optional, ClassVar, Dict, Literal, Callable, Tuple
 
 # A car's status can only be one of these three literal strings
 CarStatus = Literal["Available", "Sold", "Reserved"]
+# Maps any equal status string onto one shared instance, so cars never hold copies
+_STATUSES: Dict[str, str] = {status: status for status in ("Available", "Sold", "Reserved")}
+
+# State changes lock one of these stripes, picked by hashing the VIN. The lock count
+# stays fixed however big the lot gets; two cars only wait on each other when their
+# VINs happen to share a stripe, which is unlikely but possible.
+LOCK_STRIPES = 256
+_CAR_LOCKS = tuple(threading.RLock() for _ in range(LOCK_STRIPES))
+
+def lock_for_vin(vin: str) -> threading.RLock:
+    return _CAR_LOCKS[hash(vin) % LOCK_STRIPES]
+
+def locks_for_vins(vins) -> list[threading.RLock]:
+    """Returns the locks covering all the given VINs, in the one order every caller must take them."""
+    return [_CAR_LOCKS[stripe] for stripe in sorted({hash(vin) % LOCK_STRIPES for vin in vins})]
 
 class PermissionError(Exception):
     pass
@@ -14,7 +33,86 @@ class PermissionError(Exception):
 class VINExistsError(ValueError):
     pass
 
-@dataclass
+class VINDirectory:
+    """Records which lot (Inventory) holds each VIN, so VINs stay unique across every lot
+    in the process and any car can be found without asking each lot in turn.
+    Lots are held weakly: once an inventory is gone, its VINs are free to use again, and
+    its entries are dropped the next time a VIN is claimed or released."""
+    def __init__(self):
+        self._owners: Dict[str, weakref.ref] = {}
+        # id(lot) -> (weak reference to the lot, the VINs it holds)
+        self._lots: Dict[int, Tuple[weakref.ref, set]] = {}
+        # References to collected lots, queued by their callback and purged under the lock.
+        # The callback itself must not take the lock: collection can happen while it is held.
+        self._collected: deque = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge()
+            return len(self._owners)
+
+    def __contains__(self, vin: str) -> bool:
+        return self.owner(vin) is not None
+
+    def owner(self, vin: str):
+        """Returns the inventory holding vin, or None."""
+        owner = self._owners.get(vin)
+        return owner() if owner is not None else None
+
+    def find_car(self, vin: str) -> Optional["Car"]:
+        inventory = self.owner(vin)
+        return inventory.cars.get(vin) if inventory is not None else None
+
+    def _purge(self):
+        """Drops the entries of every lot collected since the last purge. Needs the lock."""
+        while self._collected:
+            ref = self._collected.popleft()
+            for key, (lot_ref, vins) in list(self._lots.items()):
+                if lot_ref is ref:
+                    del self._lots[key]
+                    for vin in vins:
+                        if self._owners.get(vin) is ref:
+                            del self._owners[vin]
+                    break
+
+    def claim(self, vin: str, inventory):
+        """Registers vin to inventory. Raises VINExistsError if another live lot holds it."""
+        with self._lock:
+            self._purge()
+            current = self._owners.get(vin)
+            holder = current() if current is not None else None
+            if holder is not None and holder is not inventory:
+                raise VINExistsError(f"VIN {vin} already exists in {holder.name}.")
+            if holder is None:
+                lot = self._lots.get(id(inventory))
+                if lot is None:
+                    lot = self._lots[id(inventory)] = (weakref.ref(inventory, self._collected.append), set())
+                self._owners[vin] = lot[0]
+                lot[1].add(vin)
+
+    def release(self, vin: str, inventory):
+        with self._lock:
+            self._purge()
+            current = self._owners.get(vin)
+            if current is not None and current() is inventory:
+                del self._owners[vin]
+                self._lots[id(inventory)][1].discard(vin)
+
+    def all_cars(self) -> Dict[str, "Car"]:
+        cars = {}
+        for vin in list(self._owners):
+            car = self.find_car(vin)
+            if car is not None:
+                cars[vin] = car
+        return cars
+
+# Every Inventory registers its VINs here unless it is given a directory of its own
+vin_directory = VINDirectory()
+
+# Slotted to drop the per-instance __dict__; make, model and colour are interned so
+# every car of the same kind shares one string object.
+@dataclass(slots=True)
 class Car:
     vin: str
     year: int
@@ -27,15 +125,22 @@ class Car:
     delivery_date: Optional[date] = None
     status: CarStatus = field(default="Available", init=False)
     sold_date: Optional[date] = field(default=None, init=False)
+    # Callbacks run as callback(car, attribute, old_value) after each change
+    _watchers: Tuple[Callable[["Car", str, object], None], ...] = field(default=(), init=False, repr=False, compare=False)
+    # Bumped by every change. The printed row is cached in two slots rather than a
+    # (version, text) tuple, so the cache costs no extra object per car
+    _version: int = field(default=0, init=False, repr=False, compare=False)
+    _rendered_at: int = field(default=-1, init=False, repr=False, compare=False)
+    _rendered: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
-    _registry: ClassVar[Dict[str, "Car"]] = {}
     MIN_PROFIT_MARGIN: ClassVar[float] = 0.10 # 10% minimum profit
 
     def __post_init__(self):
         vin = self.vin.strip().upper()
         if not vin:
             raise ValueError("VIN must be a non-empty string.")
-        if vin in Car._registry:
+        # Checked again when the car is added to a lot; this just catches it early
+        if vin in vin_directory:
             raise VINExistsError(f"VIN {vin} already exists.")
         if self.cost < 0 or self.price < 0:
             raise ValueError("Cost and Price must be >= 0.")
@@ -46,27 +151,70 @@ class Car:
             raise ValueError(f"Initial price ${self.price:,.2f} is below the minimum profitable price of ${min_price:,.2f}.")
 
         self.vin = vin
-        Car._registry[vin] = self
+        self.make = sys.intern(self.make)
+        self.model = sys.intern(self.model)
+        self.colour = sys.intern(self.colour)
 
     def __repr__(self) -> str:
-        return f"<Car {self.vin} | {self.year} {self.make} {self.model} | {self.colour} | ${self.price:,.2f} | {self.status}>"
+        """Formatted once per version; listings print the same unchanged cars over and over."""
+        version = self._version
+        text = self._rendered
+        if text is not None and self._rendered_at == version:
+            return text
+        text = f"<Car {self.vin} | {self.year} {self.make} {self.model} | {self.colour} | ${self.price:,.2f} | {self.status}>"
+        self._rendered, self._rendered_at = text, version
+        return text
+
+    def watch(self, callback: Callable[["Car", str, object], None]):
+        """Registers a callback that is told about every change to this car.
+        Takes the car's lock, so callers must not hold a lock that comes after it."""
+        with self.lock():
+            self._watchers = self._watchers + (callback,)
+
+    def unwatch(self, callback: Callable[["Car", str, object], None]):
+        with self.lock():
+            self._watchers = tuple(w for w in self._watchers if w != callback)
+
+    def _notify(self, attribute: str, old_value):
+        for callback in self._watchers:
+            callback(self, attribute, old_value)
+
+    def lock(self) -> threading.RLock:
+        """Returns the lock that guards this car's state changes."""
+        return lock_for_vin(self.vin)
+
+    def _update(self, **changes):
+        """Applies every change first, then notifies, so watchers always see a consistent car."""
+        with self.lock():
+            old_values = {}
+            for attribute, new_value in changes.items():
+                old_value = getattr(self, attribute)
+                if old_value != new_value:
+                    old_values[attribute] = old_value
+                    setattr(self, attribute, new_value)
+            if old_values:
+                self._version += 1
+            for attribute, old_value in old_values.items():
+                self._notify(attribute, old_value)
+
     def is_available(self) -> bool:
         return self.status == "Available"
 
-    def sell(self, sold_on: Optional[date] = None):
-        if self.status != "Available":
-            raise ValueError(f"Car is not available to be sold. Current status: {self.status}")
-        self.status = "Sold"
-        self.sold_date = sold_on or date.today()
+    def sell(self, sold_on: Optional[date] = None, allow_reserved: bool = False):
+        """Marks the car as sold. Checkout passes allow_reserved=True for cars it is holding for the buyer."""
+        with self.lock():
+            if self.status != "Available" and not (allow_reserved and self.status == "Reserved"):
+                raise ValueError(f"Car is not available to be sold. Current status: {self.status}")
+            self._update(status="Sold", sold_date=sold_on or date.today())
 
     def reserve(self):
-        if not self.is_available():
-            raise ValueError(f"Car is not available to be reserved. Current status: {self.status}")
-        self.status = "Reserved"
+        with self.lock():
+            if not self.is_available():
+                raise ValueError(f"Car is not available to be reserved. Current status: {self.status}")
+            self._update(status="Reserved")
 
     def mark_available(self):
-        self.status = "Available"
-        self.sold_date = None
+        self._update(status="Available", sold_date=None)
 
     def _require_admin(self, admin: bool):
         if not admin:
@@ -84,51 +232,78 @@ class Car:
         if not admin and new_price < min_price:
             raise PermissionError(f"Price cannot be set below the minimum profit margin. Minimum price: ${min_price:,.2f}")
             
-        self.price = float(new_price)
+        self._update(price=float(new_price))
 
     def update_make(self, new_make: str, admin: bool = False):
         self._require_admin(admin)
         if not new_make:
             raise ValueError("Make must be non-empty.")
-        self.make = new_make
+        self._update(make=sys.intern(new_make))
 
     def update_model(self, new_model: str, admin: bool = False):
         self._require_admin(admin)
         if not new_model:
             raise ValueError("Model must be non-empty.")
-        self.model = new_model
+        self._update(model=sys.intern(new_model))
 
     def update_colour(self, new_colour: str, admin: bool = False):
         self._require_admin(admin)
         if not new_colour:
             raise ValueError("Colour must be non-empty.")
-        self.colour = new_colour
+        self._update(colour=sys.intern(new_colour))
 
     def update_year(self, new_year: int, admin: bool = False):
         self._require_admin(admin)
         if new_year <= 0:
             raise ValueError("Year must be a positive integer.")
-        self.year = int(new_year)
+        self._update(year=int(new_year))
     
     def update_status(self, new_status: CarStatus, admin: bool = False):
         """Allows a Seller or Admin to manually update a car's status."""
         if new_status not in ["Available", "Sold", "Reserved"]:
             raise ValueError("Invalid status provided.")
         
-        # A seller can't un-sell a car, but an admin can.
-        if self.status == "Sold" and not admin:
-            raise PermissionError("Only an Admin can change the status of a sold car.")
+        with self.lock():
+            # A seller can't un-sell a car, but an admin can.
+            if self.status == "Sold" and not admin:
+                raise PermissionError("Only an Admin can change the status of a sold car.")
+
+            sold_date = self.sold_date
+            if new_status == "Sold" and not sold_date:
+                sold_date = date.today()
+            elif new_status in ["Available", "Reserved"]:
+                sold_date = None
+            self._update(status=_STATUSES[new_status], sold_date=sold_date)
 
-        self.status = new_status
-        if new_status == "Sold" and not self.sold_date:
-            self.sold_date = date.today()
-        elif new_status in ["Available", "Reserved"]:
-            self.sold_date = None
+    def to_record(self) -> dict:
+        """Returns the car as plain JSON-friendly values."""
+        return {
+            "vin": self.vin, "year": self.year, "make": self.make, "model": self.model,
+            "colour": self.colour, "cost": self.cost, "price": self.price,
+            "delivery_date": self.delivery_date.isoformat() if self.delivery_date else None,
+            "status": self.status,
+            "sold_date": self.sold_date.isoformat() if self.sold_date else None,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Car":
+        """Rebuilds a saved car exactly, including an admin price set below the profit margin."""
+        min_price = record["cost"] * (1 + cls.MIN_PROFIT_MARGIN)
+        car = cls(
+            record["vin"], record["year"], record["make"], record["model"], record["colour"],
+            record["cost"], max(record["price"], min_price),
+            date.fromisoformat(record["delivery_date"]) if record.get("delivery_date") else None,
+        )
+        car.price = record["price"]
+        car.status = _STATUSES[record["status"]]
+        car.sold_date = date.fromisoformat(record["sold_date"]) if record.get("sold_date") else None
+        return car
 
     @classmethod
     def get_by_vin(cls, vin: str):
-        return cls._registry.get(vin.strip().upper())
+        """Finds a car in any lot that shares the default VIN directory."""
+        return vin_directory.find_car(vin.strip().upper())
 
     @classmethod
     def all_cars(cls) -> Dict[str, "Car"]:
-        return dict(cls._registry)
\ No newline at end of file
+        return vin_directory.all_cars()
\ No newline at end of file
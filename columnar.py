@@ -0,0 +1,159 @@
+# columnar.py
+""" The columnar module keeps an optional struct-of-arrays copy of the inventory.
+    Year, cost, price, status and sold date live in contiguous NumPy arrays and
+    make, model and colour are dictionary-encoded, so filters and report totals
+    run as vectorized passes instead of walking Car objects one by one.
+    NumPy is only needed when this backend is switched on."""
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; Inventory falls back to its Python indexes.
+    np = None
+
+STATUS_CODES = {"Available": 0, "Sold": 1, "Reserved": 2}
+NO_SOLD_DATE = 0
+
+class _Dictionary:
+    """Maps repeated case-folded strings to small integer codes."""
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def encode(self, value: str) -> int:
+        key = value.casefold()
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self.codes[key] = code
+            self.values.append(key)
+        return code
+
+    def lookup(self, value: str) -> int:
+        """Returns the code for value, or -1 if no car has ever used it."""
+        return self.codes.get(value.casefold(), -1)
+
+class ColumnarStore:
+    """Struct-of-arrays mirror of an Inventory, one row per car.
+    Removing a car moves the last row into its slot, so the live rows are always
+    the first len(self) entries of every column.
+    """
+    _COLUMNS = {
+        "year": "int32",
+        "cost": "float64",
+        "price": "float64",
+        "status": "uint8",
+        "sold_on": "int32",
+        "make": "int32",
+        "model": "int32",
+        "colour": "int32",
+    }
+
+    def __init__(self, capacity: int = 1024):
+        if np is None:
+            raise ImportError("The columnar inventory backend requires NumPy (pip install numpy).")
+        self._size = 0
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self._COLUMNS.items()}
+        self._vins: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._makes = _Dictionary()
+        self._models = _Dictionary()
+        self._colours = _Dictionary()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self):
+        for name, column in self._columns.items():
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def _write(self, row: int, car):
+        columns = self._columns
+        columns["year"][row] = car.year
+        columns["cost"][row] = car.cost
+        columns["price"][row] = car.price
+        columns["status"][row] = STATUS_CODES[car.status]
+        columns["sold_on"][row] = car.sold_date.toordinal() if car.sold_date else NO_SOLD_DATE
+        columns["make"][row] = self._makes.encode(car.make)
+        columns["model"][row] = self._models.encode(car.model)
+        columns["colour"][row] = self._colours.encode(car.colour)
+
+    def add(self, car):
+        if car.vin in self._rows:
+            self.update(car)
+            return
+        if self._size == len(self._columns["year"]):
+            self._grow()
+        row = self._size
+        self._write(row, car)
+        self._vins.append(car.vin)
+        self._rows[car.vin] = row
+        self._size += 1
+
+    def update(self, car):
+        row = self._rows.get(car.vin)
+        if row is not None:
+            self._write(row, car)
+
+    def remove(self, vin: str):
+        row = self._rows.pop(vin, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            for column in self._columns.values():
+                column[row] = column[last]
+            moved_vin = self._vins[last]
+            self._vins[row] = moved_vin
+            self._rows[moved_vin] = row
+        self._vins.pop()
+        self._size -= 1
+
+    def mask(self, make=None, model=None, colour=None, status=None,
+             min_year=None, max_year=None, min_price=None, max_price=None):
+        """Builds a boolean row mask from the given predicates in one vectorized pass each."""
+        size = self._size
+        columns = self._columns
+        selected = np.ones(size, dtype=bool)
+        for name, dictionary, value in (
+            ("make", self._makes, make),
+            ("model", self._models, model),
+            ("colour", self._colours, colour),
+        ):
+            if value is not None:
+                selected &= columns[name][:size] == dictionary.lookup(value)
+        if status is not None:
+            selected &= columns["status"][:size] == STATUS_CODES[status]
+        if min_year is not None:
+            selected &= columns["year"][:size] >= min_year
+        if max_year is not None:
+            selected &= columns["year"][:size] <= max_year
+        if min_price is not None:
+            selected &= columns["price"][:size] >= min_price
+        if max_price is not None:
+            selected &= columns["price"][:size] <= max_price
+        return selected
+
+    def filter(self, **predicates) -> list[str]:
+        """Returns the VINs of every row matching the predicates accepted by mask()."""
+        rows = np.flatnonzero(self.mask(**predicates))
+        vins = self._vins
+        return [vins[row] for row in rows]
+
+    def sales_totals(self, sold_from: date | None = None, sold_to: date | None = None) -> tuple[int, float, float]:
+        """Returns (cars sold, revenue, cost of goods sold), optionally limited to a sold-date range.
+        Sales without a sold date only count when no range is given."""
+        size = self._size
+        columns = self._columns
+        sold = columns["status"][:size] == STATUS_CODES["Sold"]
+        if sold_from is not None or sold_to is not None:
+            sold &= columns["sold_on"][:size] != NO_SOLD_DATE
+        if sold_from is not None:
+            sold &= columns["sold_on"][:size] >= sold_from.toordinal()
+        if sold_to is not None:
+            sold &= columns["sold_on"][:size] <= sold_to.toordinal()
+        revenue = float(columns["price"][:size][sold].sum())
+        cost = float(columns["cost"][:size][sold].sum())
+        return int(sold.sum()), revenue, cost
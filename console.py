@@ -0,0 +1,33 @@
+# console.py
+""" The console module decides where the menus read input from and write output to.
+    A normal run uses the real keyboard and screen. A network session installs its
+    own Console for the thread serving it, and every input() and print() in the
+    menus follows it, so the same menu code can serve many users at once."""
+import builtins
+import contextvars
+import sys
+
+class Console:
+    """Reads from stdin and writes to stdout, exactly like the built-in functions."""
+    def input(self, prompt: str = "") -> str:
+        return builtins.input(prompt)
+
+    def write(self, text: str):
+        sys.stdout.write(text)
+
+_current: contextvars.ContextVar[Console] = contextvars.ContextVar("console", default=Console())
+
+def use_console(console: Console) -> contextvars.Token:
+    """Sends this thread's (or task's) input and output through console."""
+    return _current.set(console)
+
+def input(prompt: str = "") -> str:
+    return _current.get().input(prompt)
+
+def print(*args, sep: str | None = " ", end: str | None = "\n", file=None, flush: bool = False):
+    if file is not None:
+        builtins.print(*args, sep=sep, end=end, file=file, flush=flush)
+        return
+    sep = " " if sep is None else sep
+    end = "\n" if end is None else end
+    _current.get().write(sep.join(str(arg) for arg in args) + end)
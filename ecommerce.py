@@ -5,49 +5,129 @@ notification, and delivery scheduling functionalities for the car dealership sys
 from __future__ import annotations
 from typing import TYPE_CHECKING
 from car import Car
+from console import input, print
+from fulfilment import fulfilment
+from promotions import DISCOUNT_ATTRIBUTES, PromotionBook, promotions
+import threading
 if TYPE_CHECKING:
     from auth import User
+    from reservations import HoldScheduler
 
 class Cart:
-    def __init__(self, user: User):
+    def __init__(self, user: User, holds: HoldScheduler | None = None, book: PromotionBook = promotions):
+        """With holds given, each car added is reserved for this cart until its hold runs out.
+        Subtotal and discount are kept up to date as cars come and go (or are repriced while
+        in the cart), so calculate_total only reads them."""
         self.user = user
         self.items: dict[str, Car] = {}
-        self.discount_code: str | None = None
+        self.discount_codes: list[str] = []
+        self.holds = holds
+        self.book = book
+        self._subtotal = 0.0
+        self._discount = 0.0
+        self._discounts: dict[str, float] = {} # Discount each car currently contributes
+        self._lock = threading.Lock() # Staff may reprice a carted car from another terminal
+
+    def _file(self, car: Car):
+        discount = self.book.discount_for(self.discount_codes, car)
+        self._discounts[car.vin] = discount
+        self._subtotal += car.price
+        self._discount += discount
+
+    def _unfile(self, car: Car, price: float):
+        self._subtotal -= price
+        self._discount -= self._discounts.pop(car.vin, 0.0)
+
+    def _on_car_changed(self, car: Car, attribute: str, old_value):
+        if attribute in DISCOUNT_ATTRIBUTES:
+            with self._lock:
+                if car.vin in self._discounts:
+                    self._unfile(car, old_value if attribute == "price" else car.price)
+                    self._file(car)
+
+    def _refile_all(self):
+        with self._lock:
+            self._discount = 0.0
+            for car in self.items.values():
+                discount = self._discounts[car.vin] = self.book.discount_for(self.discount_codes, car)
+                self._discount += discount
 
     def add_item(self, car: Car):
-        if not car.is_available():
-            print(f"Sorry, {car.make} {car.model} is no longer available.")
-            return
-        if car.vin in self.items:
+        if car.vin in self.items and (self.holds is None or self.is_holding(car.vin)):
             print(f"{car.make} {car.model} is already in your cart.")
             return
-        self.items[car.vin] = car
+        if self.holds is not None:
+            if not self.holds.hold(car, self):
+                print(f"Sorry, {car.make} {car.model} is no longer available.")
+                return
+        elif not car.is_available():
+            print(f"Sorry, {car.make} {car.model} is no longer available.")
+            return
+        with car.lock(), self._lock: # Car lock first, as in _on_car_changed
+            if car.vin not in self.items:
+                self.items[car.vin] = car
+                self._file(car)
+                car.watch(self._on_car_changed)
         print(f"Added {car.make} {car.model} to your cart.")
+        if self.holds is not None:
+            print(f"It is reserved for you for {self.holds.hold_seconds / 60:.0f} min.")
 
     def remove_item(self, vin: str):
         vin = vin.upper()
         if vin in self.items:
-            removed_car = self.items.pop(vin)
+            with self._lock:
+                removed_car = self.items.pop(vin)
+                self._unfile(removed_car, removed_car.price)
+            removed_car.unwatch(self._on_car_changed)
+            if self.holds is not None:
+                self.holds.release(vin, self)
             print(f"Removed {removed_car.make} {removed_car.model} from your cart.")
         else:
             print("That car is not in your cart.")
 
+    def is_holding(self, vin: str) -> bool:
+        return self.holds is not None and self.holds.is_held_by(vin, self)
+
+    def clear(self):
+        """Empties the cart and puts any cars it was holding back on sale."""
+        for vin, car in self.items.items():
+            car.unwatch(self._on_car_changed)
+            if self.holds is not None:
+                self.holds.release(vin, self)
+        with self._lock:
+            self.items.clear()
+            self._discounts.clear()
+            self._subtotal = self._discount = 0.0
+
     def apply_discount(self, code: str):
-        if code.upper() == "SAVE10":
-            self.discount_code = code.upper()
-            print("Applied 10% discount!")
-            return True
-        print("Invalid discount code.")
-        return False
+        promotion = self.book.get(code)
+        if promotion is None:
+            print("Invalid discount code.")
+            return False
+        if promotion.code in self.discount_codes:
+            print(f"{promotion.code} is already applied.")
+            return False
+        current = [self.book.get(applied) for applied in self.discount_codes]
+        if promotion.exclusive or any(applied.exclusive for applied in current):
+            if self.discount_codes:
+                print(f"Exclusive codes cannot be combined: {promotion.code} replaces {', '.join(self.discount_codes)}.")
+            self.discount_codes = []
+        self.discount_codes.append(promotion.code)
+        self._refile_all()
+        print(f"Applied {promotion.code}: {promotion.description}!")
+        return True
+
+    def remove_discount(self, code: str) -> bool:
+        code = code.upper()
+        if code not in self.discount_codes:
+            return False
+        self.discount_codes.remove(code)
+        self._refile_all()
+        return True
 
     def calculate_total(self) -> tuple[float, float]:
-        subtotal = sum(car.price for car in self.items.values())
-        discount_amount = 0.0
-        if self.discount_code == "SAVE10":
-            discount_amount = subtotal * 0.10
-        
-        total = subtotal - discount_amount
-        return subtotal, total
+        # Rounded to cents so repeated adds and removes cannot leave float drift behind
+        return round(self._subtotal, 2), round(self._subtotal - self._discount, 2)
 
     def display(self):
         if not self.items:
@@ -56,12 +136,18 @@ class Cart:
         
         print("\n--- Your Shopping Cart ---")
         for car in self.items.values():
-            print(f"- {car}")
+            remaining = self.holds.remaining(car.vin, self) if self.holds is not None else None
+            if remaining is not None:
+                print(f"- {car} (reserved for {remaining / 60:.0f} more min)")
+            elif self.holds is not None and not car.is_available():
+                print(f"- {car} (reservation expired; no longer available)")
+            else:
+                print(f"- {car}")
         
         subtotal, total = self.calculate_total()
         print(f"\nSubtotal: ${subtotal:,.2f}")
-        if self.discount_code:
-            print(f"Discount ({self.discount_code}): -${(subtotal - total):,.2f}")
+        if self.discount_codes:
+            print(f"Discount ({', '.join(self.discount_codes)}): -${(subtotal - total):,.2f}")
         print(f"Total: ${total:,.2f}")
         print("--------------------------")
 
@@ -79,26 +165,25 @@ class Payment:
 
 class Notification:
     @staticmethod
-    def send_order_confirmation(user: User, cart: Cart):
-        print("\n--- Sending Notifications ---")
-        print(f"To: Buyer ({user.full_name or user.username})")
-        print("Subject: Your Order Confirmation")
-        print("Thank you for your purchase! Your order details:")
-        for car in cart.items.values():
-            print(f"- {car.make} {car.model} (VIN: {car.vin})")
-        _, total = cart.calculate_total()
-        print(f"Total Paid: ${total:,.2f}")
-        
-        print("\nTo: Dealership Sales Team")
-        print("Subject: New Sale Alert!")
-        print(f"A new sale has been made to {user.full_name or user.username}.")
-        print("-----------------------------")
+    def send_order_confirmation(user: User, order: dict, delivery: dict | None = None):
+        """Shows the buyer their receipt and queues the emails and delivery booking in the background."""
+        print("\n--- Order Confirmation ---")
+        print(f"Order {order['order_id']} for {user.full_name or user.username}")
+        for car in order["cars"]:
+            print(f"- {car['make']} {car['model']} (VIN: {car['vin']})")
+        print(f"Total Paid: ${order['total']:,.2f}")
+        fulfilment.submit_order(order, delivery)
+        print("A confirmation email is on its way, and the sales team has been notified.")
+        print("--------------------------")
 
 class Delivery:
     @staticmethod
-    def schedule():
+    def schedule() -> dict:
+        """Asks for the delivery details. The booking itself is made by the fulfilment pipeline."""
         print("\n--- Scheduling Delivery ---")
         address = input("Enter delivery address: ")
         date = input("Enter desired delivery date (e.g., YYYY-MM-DD): ")
-        print(f"Delivery for the purchased vehicle(s) scheduled for {date} to {address}.")
+        print(f"Delivery for the purchased vehicle(s) requested for {date} to {address}.")
+        print("You will receive a confirmation once it is booked.")
         print("---------------------------")
+        return {"address": address, "date": date}
@@ -0,0 +1,190 @@
+# events.py
+""" The events module records every change to the inventory as a numbered event.
+    Events go into a fixed-size ring buffer, so memory stays flat however busy the
+    lot is. Reports, caches and exporters subscribe and read the events after their
+    last one, instead of rescanning the whole inventory to spot what changed.
+
+    A subscriber that cannot keep up either slows the writers down (a blocking
+    subscription) or is told how many events it missed so it can rebuild its state
+    and carry on (a non-blocking one). Events are recorded under the inventory lock,
+    so record() itself never waits: it only notes that a blocking subscriber has
+    passed its high-water mark, and the writer waits in wait_for_readers once it
+    has let go of its locks."""
+from __future__ import annotations
+import threading
+import time
+import weakref
+
+ADDED, REMOVED, CHANGED = "added", "removed", "changed"
+
+class InventoryEvent:
+    """One change to the inventory. car is the live Car, so read anything beyond
+    new_value straight away; attribute, old_value and new_value are None unless changed."""
+    __slots__ = ("seq", "kind", "vin", "car", "attribute", "old_value", "new_value", "timestamp")
+
+    def __init__(self, seq: int, kind: str, car, attribute: str | None = None, old_value=None, new_value=None):
+        self.seq = seq
+        self.kind = kind
+        self.vin = car.vin
+        self.car = car
+        self.attribute = attribute
+        self.old_value = old_value
+        self.new_value = new_value
+        self.timestamp = time.time()
+
+    def __repr__(self):
+        if self.kind == CHANGED:
+            return f"<Event {self.seq} {self.vin} {self.attribute}: {self.old_value!r} -> {self.new_value!r}>"
+        return f"<Event {self.seq} {self.vin} {self.kind}>"
+
+class EventsLost(Exception):
+    """Raised by Subscription.poll when events were overwritten before the subscriber read them.
+    The subscription has already moved on to resume_seq, the oldest event still kept."""
+    def __init__(self, missed: int, resume_seq: int):
+        super().__init__(f"{missed} inventory event(s) were lost; resuming from event {resume_seq}.")
+        self.missed = missed
+        self.resume_seq = resume_seq
+
+class EventLog:
+    """A ring buffer of the last capacity inventory events, numbered from 1.
+    A blocking subscriber with high_water or more unread events holds writers back
+    in wait_for_readers for up to block_timeout; one that takes longer is marked
+    lagging, writers stop waiting for it, and it gets EventsLost if it falls a whole
+    buffer behind."""
+    def __init__(self, capacity: int = 4096, block_timeout: float = 0.5, high_water: int | None = None):
+        self.capacity = capacity
+        self.block_timeout = block_timeout
+        # Leaves a quarter of the buffer as headroom for the changes made before the writer checks
+        self.high_water = high_water if high_water is not None else capacity * 3 // 4
+        self._buffer: list[InventoryEvent | None] = [None] * capacity
+        self._next_seq = 1
+        self._condition = threading.Condition()
+        # Only blocking subscriptions matter to writers, so only they are tracked
+        self._blocking: weakref.WeakSet[Subscription] = weakref.WeakSet()
+        self._behind = False # A blocking subscriber is at or past high_water
+
+    @property
+    def last_seq(self) -> int:
+        """Number of the newest event, or 0 if there has been none."""
+        return self._next_seq - 1
+
+    @property
+    def first_seq(self) -> int:
+        """Number of the oldest event still in the buffer."""
+        return max(1, self._next_seq - self.capacity)
+
+    def record(self, action: str, car, attribute=None, old_value=None):
+        """Inventory listener: appends one event. Called with the inventory lock held, so
+        events are numbered in exactly the order the changes were applied."""
+        new_value = getattr(car, attribute) if attribute is not None else None
+        with self._condition:
+            seq = self._next_seq
+            self._buffer[seq % self.capacity] = InventoryEvent(seq, action, car, attribute, old_value, new_value)
+            self._next_seq = seq + 1
+            if self._blocking and not self._behind and self._laggards():
+                self._behind = True
+            self._condition.notify_all()
+
+    def _laggards(self) -> list[Subscription]:
+        """Blocking subscribers at or past high_water that writers still wait for."""
+        limit = self._next_seq - self.high_water
+        return [subscription for subscription in list(self._blocking)
+                if not subscription.lagging and not subscription.closed and subscription._cursor <= limit]
+
+    @property
+    def backlogged(self) -> bool:
+        """True while a blocking subscriber is at or past high_water."""
+        return self._behind
+
+    def wait_for_readers(self, timeout: float | None = None) -> bool:
+        """Back-pressure for writers: waits until every blocking subscriber is below high_water,
+        for up to timeout (default block_timeout) seconds. Returns at once when none is behind.
+        Call it holding no inventory or car lock, or every other writer waits as well.
+        Returns False if it gave up; the subscribers it waited for are then marked lagging."""
+        if not self._behind:
+            return True
+        deadline = time.monotonic() + (self.block_timeout if timeout is None else timeout)
+        with self._condition:
+            while True:
+                laggards = self._laggards()
+                if not laggards:
+                    self._behind = False
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    for subscription in laggards:
+                        subscription.lagging = True
+                    self._behind = False
+                    return False
+                self._condition.wait(remaining)
+
+    def subscribe(self, from_seq: int | None = None, blocking: bool = False) -> Subscription:
+        """Starts following events from from_seq (default: only events from now on).
+        A blocking subscription slows writers down rather than miss events."""
+        with self._condition:
+            cursor = self._next_seq if from_seq is None else max(1, from_seq)
+            subscription = Subscription(self, cursor, blocking)
+            if blocking:
+                self._blocking.add(subscription)
+                if self._laggards():
+                    self._behind = True
+        return subscription
+
+class Subscription:
+    """One reader's position in an EventLog."""
+    def __init__(self, log: EventLog, cursor: int, blocking: bool):
+        self.log = log
+        self.blocking = blocking
+        self.lagging = False
+        self.closed = False
+        self._cursor = cursor
+
+    @property
+    def next_seq(self) -> int:
+        """Number of the next event poll will return."""
+        return self._cursor
+
+    @property
+    def lag(self) -> int:
+        """Events recorded but not yet read."""
+        return self.log._next_seq - self._cursor
+
+    def poll(self, max_events: int = 256, timeout: float | None = 0.0) -> list[InventoryEvent]:
+        """Returns up to max_events events in order, waiting up to timeout seconds
+        (None waits for ever) for the first one. Returns [] on timeout or once closed."""
+        log = self.log
+        with log._condition:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._cursor >= log._next_seq and not self.closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                log._condition.wait(remaining)
+            if self.closed:
+                return []
+
+            first = log.first_seq
+            if self._cursor < first:
+                missed = first - self._cursor
+                self._cursor = first
+                self.lagging = False
+                raise EventsLost(missed, first)
+            end = min(log._next_seq, self._cursor + max_events)
+            events = [log._buffer[seq % log.capacity] for seq in range(self._cursor, end)]
+            self._cursor = end
+            if self.lagging and log._next_seq - end < log.high_water:
+                self.lagging = False # Caught up; writers wait for it again
+            if log._behind:
+                log._condition.notify_all()
+            return events
+
+    def __iter__(self):
+        """Yields events as they happen until the subscription is closed."""
+        while not self.closed:
+            yield from self.poll(timeout=None)
+
+    def close(self):
+        with self.log._condition:
+            self.closed = True
+            self.log._blocking.discard(self)
+            self.log._condition.notify_all()
@@ -0,0 +1,202 @@
+# fulfilment.py
+""" The fulfilment module does the slow work that follows a successful payment:
+    emailing the buyer, booking the delivery and telling the sales team.
+    Checkout only queues that work, so the buyer's terminal is never kept waiting
+    on it. A background worker sends queued messages in batches, retries a batch
+    that fails, and rolls individual sale alerts up into one periodic digest.
+
+    Until real mail and logistics services are wired in, "sending" appends JSON
+    lines to files in an outbox folder, one file per channel."""
+from __future__ import annotations
+import heapq
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+CHANNELS = ("email", "delivery")
+FAILED_CHANNEL = "failed"  # Messages that ran out of retries end up in failed.jsonl
+
+class Outbox:
+    """File-based stand-in for the mail and delivery services."""
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, channel: str, messages: list[dict]):
+        """Delivers a batch to one channel with a single write. Raises OSError if it fails."""
+        path = os.path.join(self.directory, f"{channel}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(message) + "\n" for message in messages))
+            f.flush()
+            os.fsync(f.fileno())
+
+class FulfilmentPipeline:
+    """Queues post-payment messages and sends them from one background thread.
+    A batch that fails is retried with exponential backoff; after max_attempts its
+    messages are written to failed.jsonl for staff to follow up by hand.
+    """
+    def __init__(self, batch_size: int = 32, max_attempts: int = 5, retry_delay: float = 0.5,
+                 digest_interval: float = 60.0, digest_size: int = 50):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.digest_interval = digest_interval
+        self.digest_size = digest_size
+        self.outbox: Outbox | None = None
+        self._queue: queue.Queue = queue.Queue()
+        self._retries: list[tuple[float, int, str, list[dict], int]] = []
+        self._sequence = itertools.count()
+        self._sales: list[dict] = []
+        self._digest_due = 0.0
+        self._worker: threading.Thread | None = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    def start(self, directory: str):
+        """Starts the worker, sending into an outbox kept in directory."""
+        if self.running:
+            return
+        self.outbox = Outbox(directory)
+        self._stopping = False
+        self._digest_due = time.monotonic() + self.digest_interval
+        self._worker = threading.Thread(target=self._run, name="fulfilment", daemon=True)
+        self._worker.start()
+
+    def close(self):
+        """Sends everything still queued, including the pending sales digest, then stops the worker."""
+        if not self.running:
+            return
+        self._stopping = True
+        self._queue.put(None)
+        self._worker.join()
+        self._worker = None
+
+    def pending(self) -> int:
+        return self._queue.qsize() + sum(len(messages) for _, _, _, messages, _ in self._retries)
+
+    # ---------------- Producers (called from checkout) ----------------
+
+    def submit_order(self, order: dict, delivery: dict | None = None):
+        """Queues the buyer's confirmation, the delivery booking and a sale alert for one order."""
+        if not self.running:
+            raise RuntimeError("The fulfilment pipeline has not been started.")
+        self._queue.put(("email", {
+            "to": order["buyer"],
+            "subject": f"Your Order Confirmation ({order['order_id']})",
+            "order": order,
+        }))
+        if delivery is not None:
+            self._queue.put(("delivery", {"order_id": order["order_id"], **delivery}))
+        self._queue.put(("sale", order))
+
+    # ---------------- Worker ----------------
+
+    def _run(self):
+        while True:
+            timeout = self._next_wakeup() - time.monotonic()
+            try:
+                job = self._queue.get(timeout=max(0.0, timeout))
+            except queue.Empty:
+                job = None
+            batches: dict[str, list[dict]] = {channel: [] for channel in CHANNELS}
+            count = 0
+            while job is not None:
+                self._collect(job, batches)
+                count += 1
+                if count >= self.batch_size:
+                    break
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    job = None
+
+            for channel, messages in batches.items():
+                if messages:
+                    self._send(channel, messages, attempt=1)
+            self._send_due_retries()
+            if len(self._sales) >= self.digest_size or time.monotonic() >= self._digest_due:
+                self._send_digest()
+
+            if self._stopping and self._queue.empty():
+                self._send_digest()
+                self._drain_retries()
+                return
+
+    def _collect(self, job: tuple[str, dict], batches: dict[str, list[dict]]):
+        channel, message = job
+        if channel == "sale":
+            self._sales.append(message)
+        else:
+            batches[channel].append(message)
+
+    def _next_wakeup(self) -> float:
+        wakeup = self._digest_due
+        if self._retries:
+            wakeup = min(wakeup, self._retries[0][0])
+        return wakeup
+
+    def _send(self, channel: str, messages: list[dict], attempt: int):
+        try:
+            self.outbox.send(channel, messages)
+        except OSError as e:
+            if attempt >= self.max_attempts:
+                self._give_up(channel, messages, e)
+                return
+            retry_at = time.monotonic() + self.retry_delay * 2 ** (attempt - 1)
+            heapq.heappush(self._retries, (retry_at, next(self._sequence), channel, messages, attempt + 1))
+
+    def _send_due_retries(self):
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now:
+            _, _, channel, messages, attempt = heapq.heappop(self._retries)
+            self._send(channel, messages, attempt)
+
+    def _drain_retries(self):
+        """On shutdown, waits out the remaining retries rather than dropping them."""
+        while self._retries:
+            time.sleep(max(0.0, self._retries[0][0] - time.monotonic()))
+            self._send_due_retries()
+
+    def _give_up(self, channel: str, messages: list[dict], error: OSError):
+        failed = [{"channel": channel, "error": str(error), "message": message} for message in messages]
+        try:
+            self.outbox.send(FAILED_CHANNEL, failed)
+        except OSError:
+            pass # Nowhere left to record it; the journal still has the sale itself
+
+    def _send_digest(self):
+        self._digest_due = time.monotonic() + self.digest_interval
+        if not self._sales:
+            return
+        sales, self._sales = self._sales, []
+        revenue = sum(order["total"] for order in sales)
+        digest = {
+            "to": "Dealership Sales Team",
+            "subject": f"Sales Digest: {len(sales)} new sale(s), ${revenue:,.2f}",
+            "orders": [{"order_id": order["order_id"], "buyer": order["buyer"], "total": order["total"],
+                        "cars": [f"{car['make']} {car['model']} ({car['vin']})" for car in order["cars"]]}
+                       for order in sales],
+        }
+        self._send("email", [digest], attempt=1)
+
+def new_order(buyer: str, cars, total: float) -> dict:
+    """Builds the order record the pipeline sends, copied out so later changes to the cars do not leak in."""
+    return {
+        "order_id": uuid.uuid4().hex[:10].upper(),
+        "placed_at": datetime.now().isoformat(timespec="seconds"),
+        "buyer": buyer,
+        "cars": [{"vin": car.vin, "year": car.year, "make": car.make, "model": car.model, "price": car.price}
+                 for car in cars],
+        "total": round(total, 2),
+    }
+
+# The one shared pipeline every terminal submits to
+fulfilment = FulfilmentPipeline()
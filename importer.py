@@ -0,0 +1,119 @@
+# importer.py
+""" The importer module loads deliveries and auction manifests from CSV or JSONL files.
+    Rows are read and validated a batch at a time, so memory stays flat however large
+    the file is. Bad rows are reported and skipped instead of stopping the import."""
+from __future__ import annotations
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, Iterator
+from car import Car
+if TYPE_CHECKING:
+    from inventory import Inventory
+
+REQUIRED_FIELDS = ("vin", "year", "make", "model", "colour", "cost", "price")
+
+@dataclass
+class RejectedRow:
+    line: int
+    vin: str
+    reason: str
+
+@dataclass
+class ImportReport:
+    added: int = 0
+    rejected: list[RejectedRow] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return f"Imported {self.added} car(s), rejected {len(self.rejected)} row(s)."
+
+def read_rows(path: str) -> Iterator[tuple[int, dict]]:
+    """Yields (line number, row) from a .csv or .jsonl file without loading it all at once."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if extension == ".csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        elif extension in (".jsonl", ".ndjson"):
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, {"_error": f"Invalid JSON: {e.msg}"}
+                    continue
+                if not isinstance(row, dict):
+                    row = {"_error": "Row must be a JSON object"}
+                yield line_number, row
+        else:
+            raise ValueError(f"Unsupported file type '{extension}'. Use .csv or .jsonl.")
+
+def _is_blank(value) -> bool:
+    return value is None or str(value).strip() == ""
+
+def _parse_row(row: dict) -> dict:
+    if "_error" in row:
+        raise ValueError(row["_error"])
+    missing = [name for name in REQUIRED_FIELDS if _is_blank(row.get(name))]
+    if missing:
+        raise ValueError(f"Missing field(s): {', '.join(missing)}.")
+    try:
+        return {
+            "vin": str(row["vin"]).strip().upper(),
+            "year": int(row["year"]),
+            "make": str(row["make"]).strip(),
+            "model": str(row["model"]).strip(),
+            "colour": str(row["colour"]).strip(),
+            "cost": float(str(row["cost"]).replace("$", "").replace(",", "")),
+            "price": float(str(row["price"]).replace("$", "").replace(",", "")),
+        }
+    except (TypeError, ValueError):
+        raise ValueError("Year, cost and price must be numbers.")
+
+def _validate_batch(batch: list[tuple[int, dict]], inventory: Inventory, report: ImportReport) -> list[Car]:
+    """Checks a batch for duplicate VINs and profit margin before any car is created."""
+    parsed = []
+    seen_in_batch = set()
+    for line_number, row in batch:
+        vin = "" if _is_blank(row.get("vin")) else str(row["vin"]).strip().upper()
+        try:
+            fields = _parse_row(row)
+        except ValueError as e:
+            report.rejected.append(RejectedRow(line_number, vin, str(e)))
+            continue
+        if fields["vin"] in seen_in_batch or fields["vin"] in inventory.cars or fields["vin"] in inventory.directory:
+            report.rejected.append(RejectedRow(line_number, vin, f"VIN {fields['vin']} already exists."))
+            continue
+        min_price = fields["cost"] * (1 + Car.MIN_PROFIT_MARGIN)
+        if fields["price"] < min_price:
+            report.rejected.append(RejectedRow(
+                line_number, vin,
+                f"Price ${fields['price']:,.2f} is below the minimum profitable price of ${min_price:,.2f}."))
+            continue
+        seen_in_batch.add(fields["vin"])
+        parsed.append((line_number, fields))
+
+    cars = []
+    for line_number, fields in parsed:
+        try:
+            cars.append(Car(**fields))
+        except ValueError as e:  # Anything Car still refuses, e.g. a negative cost
+            report.rejected.append(RejectedRow(line_number, fields["vin"], str(e)))
+    return cars
+
+def _batches(rows: Iterable[tuple[int, dict]], batch_size: int) -> Iterator[list[tuple[int, dict]]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+def import_cars(path: str, inventory: Inventory, batch_size: int = 500) -> ImportReport:
+    """Streams cars from a CSV or JSONL file into inventory, batch_size rows at a time."""
+    report = ImportReport()
+    for batch in _batches(read_rows(path), batch_size):
+        cars = _validate_batch(batch, inventory, report)
+        report.added += inventory.add_cars(cars)
+    return report
@@ -0,0 +1,338 @@
+# indexes.py
+""" The indexes module holds the in-memory lookup structures the inventory keeps
+    alongside its car dictionary, so searches do not have to scan every car.
+    Readers do not lock: anything they iterate is first copied in a single C-level
+    call (list(), tuple() or a slice), which another thread cannot interleave with."""
+import bisect
+
+def levenshtein_distance(s1, s2):
+    """Calculates the Levenshtein distance between two strings."""
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1 # Swapped in place rather than recursing, so instrumentation counts one call
+
+    if len(s2) == 0:
+        return len(s1)
+
+    previous_row = range(len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        previous_row = current_row
+
+    return previous_row[-1]
+
+def bounded_levenshtein(s1, s2, max_distance):
+    """Calculates the Levenshtein distance, giving up once it must exceed max_distance.
+    Only the diagonal band of width max_distance is computed. Returns max_distance + 1
+    when the real distance is larger than max_distance.
+    """
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    too_far = max_distance + 1
+    if len(s1) - len(s2) > max_distance:
+        return too_far
+    if len(s2) == 0:
+        return len(s1)
+
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1, start=1):
+        # Cells outside the band are treated as already too far.
+        start = max(1, i - max_distance)
+        end = min(len(s2), i + max_distance)
+        current_row = [too_far] * (len(s2) + 1)
+        if start == 1:
+            current_row[0] = i
+        row_min = current_row[0] if start == 1 else too_far
+        for j in range(start, end + 1):
+            insertions = previous_row[j] + 1
+            deletions = current_row[j - 1] + 1
+            substitutions = previous_row[j - 1] + (c1 != s2[j - 1])
+            cell = min(insertions, deletions, substitutions, too_far)
+            current_row[j] = cell
+            if cell < row_min:
+                row_min = cell
+        if row_min > max_distance:
+            return too_far
+        previous_row = current_row
+
+    return min(previous_row[-1], too_far)
+
+class VINIndex:
+    """Finds VINs within a few edits of a search term without checking every VIN.
+    Each VIN is cut into max_distance + 1 pieces. A VIN that is k edits away from the
+    term keeps at least (pieces - k) of its pieces unchanged, each shifted by at most
+    k places, so only VINs sharing that many pieces with the term get a (banded)
+    distance check. Wider searches fall back to checking every VIN.
+    """
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        self._piece_count = max_distance + 1
+        self._pieces: dict[tuple[int, int, str], set[str]] = {}
+        self._vins: set[str] = set()
+        self._short: set[str] = set()  # Too short to cut into non-empty pieces; always checked
+
+    def __len__(self) -> int:
+        return len(self._vins)
+
+    def __contains__(self, vin: str) -> bool:
+        return vin in self._vins
+
+    def _bounds(self, length: int) -> list[tuple[int, int]]:
+        count = self._piece_count
+        return [(i * length // count, (i + 1) * length // count) for i in range(count)]
+
+    def _keys(self, vin: str):
+        for piece, (start, end) in enumerate(self._bounds(len(vin))):
+            yield (len(vin), piece, vin[start:end])
+
+    def add(self, vin: str):
+        if vin in self._vins:
+            return
+        self._vins.add(vin)
+        if len(vin) < self._piece_count:
+            self._short.add(vin)
+            return
+        for key in self._keys(vin):
+            self._pieces.setdefault(key, set()).add(vin)
+
+    def remove(self, vin: str):
+        if vin not in self._vins:
+            return
+        self._vins.discard(vin)
+        if len(vin) < self._piece_count:
+            self._short.discard(vin)
+            return
+        for key in self._keys(vin):
+            _discard(self._pieces, key, vin)
+
+    def _candidates(self, term: str, max_distance: int) -> set[str]:
+        """Returns every VIN that keeps enough pieces of itself somewhere in term."""
+        needed = self._piece_count - max_distance
+        matched: dict[str, set[int]] = {}
+        for length in range(max(self._piece_count, len(term) - max_distance), len(term) + max_distance + 1):
+            for piece, (start, end) in enumerate(self._bounds(length)):
+                size = end - start
+                for shift in range(-max_distance, max_distance + 1):
+                    position = start + shift
+                    if position < 0 or position + size > len(term):
+                        continue
+                    for vin in tuple(self._pieces.get((length, piece, term[position:position + size]), ())):
+                        matched.setdefault(vin, set()).add(piece)
+        candidates = {vin for vin, pieces in matched.items() if len(pieces) >= needed}
+        return candidates | self._short
+
+    def within(self, term: str, max_distance: int) -> list[tuple[int, str]]:
+        """Returns every (distance, vin) with distance <= max_distance, best first."""
+        if max_distance < 0:
+            return []
+        if max_distance > self.max_distance:
+            candidates = tuple(self._vins)
+        else:
+            candidates = self._candidates(term, max_distance)
+
+        matches = []
+        for vin in candidates:
+            distance = bounded_levenshtein(term, vin, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, vin))
+        matches.sort()
+        return matches
+
+    def nearest(self, term: str, max_distance: int | None = None) -> tuple[int, str] | None:
+        """Returns the closest (distance, vin), or None if nothing is within max_distance.
+        Ties are broken by VIN so the answer does not depend on insertion order.
+        """
+        if term in self._vins and (max_distance is None or max_distance >= 0):
+            return 0, term
+        limit = max_distance if max_distance is not None else float("inf")
+
+        # Widen the search one edit at a time; most typos are a single slip.
+        for distance in range(1, int(min(limit, self.max_distance)) + 1):
+            matches = self.within(term, distance)
+            if matches:
+                return matches[0]
+        if limit <= self.max_distance:
+            return None
+
+        best = None
+        for vin in tuple(self._vins):
+            if best is None and limit == float("inf"):
+                distance = levenshtein_distance(term, vin)
+            else:
+                bound = best[0] if best is not None else limit
+                distance = bounded_levenshtein(term, vin, int(bound))
+            if distance <= limit and (best is None or (distance, vin) < best):
+                best = (distance, vin)
+        return best
+
+class AttributeIndex:
+    """Case-folded hash indexes from make -> model -> VINs, colour -> VINs and year -> VINs.
+    The keys each VIN was filed under are remembered, so a car can be re-filed
+    after it changes without knowing its old values.
+    """
+    def __init__(self):
+        self._by_make: dict[str, dict[str, set[str]]] = {}
+        self._by_colour: dict[str, set[str]] = {}
+        self._by_year: dict[int, set[str]] = {}
+        self._keys: dict[str, tuple[str, str, str, int]] = {}
+
+    def add(self, car):
+        make, model, colour = car.make.casefold(), car.model.casefold(), car.colour.casefold()
+        self._by_make.setdefault(make, {}).setdefault(model, set()).add(car.vin)
+        self._by_colour.setdefault(colour, set()).add(car.vin)
+        self._by_year.setdefault(car.year, set()).add(car.vin)
+        self._keys[car.vin] = (make, model, colour, car.year)
+
+    def remove(self, vin: str):
+        keys = self._keys.pop(vin, None)
+        if keys is None:
+            return
+        make, model, colour, year = keys
+
+        models = self._by_make[make]
+        models[model].discard(vin)
+        if not models[model]:
+            del models[model]
+            if not models:
+                del self._by_make[make]
+        _discard(self._by_colour, colour, vin)
+        _discard(self._by_year, year, vin)
+
+    def update(self, car):
+        self.remove(car.vin)
+        self.add(car)
+
+    def by_make(self, make: str) -> list[str]:
+        models = self._by_make.get(make.casefold(), {})
+        return [vin for vins in list(models.values()) for vin in list(vins)]
+
+    def by_make_and_model(self, make: str, model: str) -> list[str]:
+        return list(self._by_make.get(make.casefold(), {}).get(model.casefold(), ()))
+
+    def by_colour(self, colour: str) -> list[str]:
+        return list(self._by_colour.get(colour.casefold(), ()))
+
+    def by_year(self, year: int) -> list[str]:
+        return list(self._by_year.get(year, ()))
+
+    def by_years(self, min_year: int, max_year: int) -> list[str]:
+        return [vin for year, vins in list(self._by_year.items()) if min_year <= year <= max_year for vin in list(vins)]
+
+    # Counts let a query planner compare access paths without building any lists
+
+    def count_make(self, make: str) -> int:
+        return sum(len(vins) for vins in list(self._by_make.get(make.casefold(), {}).values()))
+
+    def count_make_and_model(self, make: str, model: str) -> int:
+        return len(self._by_make.get(make.casefold(), {}).get(model.casefold(), ()))
+
+    def count_colour(self, colour: str) -> int:
+        return len(self._by_colour.get(colour.casefold(), ()))
+
+    def count_years(self, min_year: int, max_year: int) -> int:
+        return sum(len(vins) for year, vins in list(self._by_year.items()) if min_year <= year <= max_year)
+
+def _discard(index: dict, key, vin: str):
+    vins = index.get(key)
+    if vins is not None:
+        vins.discard(vin)
+        if not vins:
+            del index[key]
+
+class PriceIndex:
+    """A sorted list of (price, vin) pairs for the cars that are currently available.
+    Range queries are two bisects and a slice.
+    """
+    def __init__(self):
+        self._entries: list[tuple[float, str]] = []
+        self._prices: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, vin: str, price: float):
+        if vin in self._prices:
+            self.remove(vin)
+        bisect.insort(self._entries, (price, vin))
+        self._prices[vin] = price
+
+    def add_many(self, pairs):
+        """Adds or moves many (vin, price) pairs with one filtering pass and a single sort
+        instead of one insort (and removal) each. Readers keep the old list until the new one is ready."""
+        pairs = dict(pairs)
+        moved = [vin for vin in pairs if vin in self._prices]
+        entries = self._entries
+        if moved:
+            moved = set(moved)
+            entries = [entry for entry in entries if entry[1] not in moved]
+        else:
+            entries = entries.copy()
+        entries.extend((price, vin) for vin, price in pairs.items())
+        entries.sort()
+        self._prices.update(pairs)
+        self._entries = entries
+
+    def remove(self, vin: str):
+        price = self._prices.pop(vin, None)
+        if price is None:
+            return
+        position = bisect.bisect_left(self._entries, (price, vin))
+        del self._entries[position]
+
+    def range(self, min_price: float, max_price: float) -> list[str]:
+        start = bisect.bisect_left(self._entries, (min_price, ""))
+        end = bisect.bisect_right(self._entries, (max_price, _AFTER_ANY_VIN))
+        return [vin for _, vin in self._entries[start:end]]
+
+    def count(self, min_price: float, max_price: float) -> int:
+        start = bisect.bisect_left(self._entries, (min_price, ""))
+        return max(0, bisect.bisect_right(self._entries, (max_price, _AFTER_ANY_VIN)) - start)
+
+    def cheapest(self, count: int) -> list[str]:
+        return [vin for _, vin in self._entries[:max(count, 0)]]
+
+    def most_expensive(self, count: int) -> list[str]:
+        if count <= 0:
+            return []
+        return [vin for _, vin in reversed(self._entries[-count:])]
+
+# Sorts after every real VIN, so bisect_right lands past all cars at a given price.
+_AFTER_ANY_VIN = "\U0010ffff"
+
+class OrderedVINs:
+    """VINs kept in sorted order, so listings can be paged with a VIN as the cursor.
+    A cursor stays valid even if cars are added or removed between pages.
+    """
+    def __init__(self):
+        self._vins: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._vins)
+
+    def __contains__(self, vin: str) -> bool:
+        position = bisect.bisect_left(self._vins, vin)
+        return position < len(self._vins) and self._vins[position] == vin
+
+    def add(self, vin: str):
+        if vin not in self:
+            bisect.insort(self._vins, vin)
+
+    def add_many(self, vins):
+        """Adds many VINs with a single sort instead of one insort each."""
+        new_vins = [vin for vin in vins if vin not in self]
+        self._vins.extend(new_vins)
+        self._vins.sort()
+
+    def remove(self, vin: str):
+        position = bisect.bisect_left(self._vins, vin)
+        if position < len(self._vins) and self._vins[position] == vin:
+            del self._vins[position]
+
+    def after(self, cursor: str | None, count: int) -> list[str]:
+        """Returns up to count VINs that sort after cursor (from the start if cursor is None)."""
+        start = 0 if cursor is None else bisect.bisect_right(self._vins, cursor)
+        return self._vins[start:start + count]
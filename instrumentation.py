@@ -0,0 +1,138 @@
+# instrumentation.py
+""" The instrumentation module measures how often the dealership's key operations run
+    and how long they take. It is off by default. Turning it on wraps the measured
+    functions in timers, and turning it off puts the originals back, so a terminal
+    that never enables it pays nothing at all."""
+import functools
+import inspect
+import json
+import math
+import threading
+import time
+
+BUCKETS_PER_DOUBLING = 4  # Histogram resolution: each bucket is about 19% wider than the last
+
+class LatencyHistogram:
+    """Call count, total time and a log-scale histogram of latencies for one operation."""
+    __slots__ = ("calls", "total", "max", "_buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._buckets: dict[int, int] = {}
+
+    def record(self, seconds: float):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        micros = seconds * 1e6
+        bucket = int(math.log2(micros) * BUCKETS_PER_DOUBLING) if micros > 1 else 0
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the latency in seconds below which the given fraction of calls fell."""
+        if not self.calls:
+            return 0.0
+        target = fraction * self.calls
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= target:
+                upper = 2 ** ((bucket + 1) / BUCKETS_PER_DOUBLING) / 1e6
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "total_s": round(self.total, 6),
+            "mean_ms": round(self.total / self.calls * 1e3, 4) if self.calls else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1e3, 4),
+            "p95_ms": round(self.percentile(0.95) * 1e3, 4),
+            "p99_ms": round(self.percentile(0.99) * 1e3, 4),
+            "max_ms": round(self.max * 1e3, 4),
+        }
+
+class Instrumentation:
+    """Installs and removes timing wrappers and keeps one histogram per operation."""
+    def __init__(self):
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._originals: list[tuple[object, str, object]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._originals)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def _timed(self, name: str, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+    def _wrap(self, owner, attribute: str, name: str):
+        original = getattr(owner, attribute)
+        self._originals.append((owner, attribute, original))
+        setattr(owner, attribute, self._timed(name, original))
+
+    def enable(self, main_module=None):
+        """Starts timing the Inventory methods, levenshtein_distance and bounded_levenshtein (the
+        one fuzzy VIN lookups use), Cart.calculate_total, Payment.process and, if main_module is
+        given, its handle_* menu handlers."""
+        if self.enabled:
+            return
+        import indexes
+        import inventory
+        from ecommerce import Cart, Payment
+
+        for attribute, member in list(vars(inventory.Inventory).items()):
+            # Generators would only be timed until their first yield, so they are left alone
+            if not attribute.startswith("_") and inspect.isfunction(member) and not inspect.isgeneratorfunction(member):
+                self._wrap(inventory.Inventory, attribute, f"Inventory.{attribute}")
+        # Wrap the function where it is defined and where inventory re-exports it
+        self._wrap(indexes, "levenshtein_distance", "levenshtein_distance")
+        inventory_original = inventory.levenshtein_distance
+        self._originals.append((inventory, "levenshtein_distance", inventory_original))
+        inventory.levenshtein_distance = indexes.levenshtein_distance
+        self._wrap(indexes, "bounded_levenshtein", "bounded_levenshtein")
+        self._wrap(Cart, "calculate_total", "Cart.calculate_total")
+        self._wrap(Payment, "process", "Payment.process")
+        if main_module is not None:
+            for attribute, member in list(vars(main_module).items()):
+                if attribute.startswith("handle_") and inspect.isfunction(member):
+                    self._wrap(main_module, attribute, f"main.{attribute}")
+
+    def disable(self):
+        """Puts every original function back. Collected figures are kept."""
+        while self._originals:
+            owner, attribute, original = self._originals.pop()
+            setattr(owner, attribute, original)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def summary(self) -> dict[str, dict]:
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def dump(self, path: str):
+        """Writes the current figures to path as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+# The one shared instance the whole program reports into
+metrics = Instrumentation()
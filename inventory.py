@@ -1,99 +1,451 @@
 # inventory.py
 """ The inventory module manages the car dealership's inventory, including
-    car management and inventory reporting."""
-
-from car import Car
-
-def levenshtein_distance(s1, s2):
-    """Calculates the Levenshtein distance between two strings."""
-    if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
-
-    if len(s2) == 0:
-        return len(s1)
-
-    previous_row = range(len(s2) + 1)
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-    
-    return previous_row[-1]
+    car management and inventory reporting.
+    Changes to the indexes happen under one short-lived lock; reads never lock and
+    work from a consistent copy of whatever index they use."""
+import threading
+from contextlib import ExitStack
+from car import Car, VINExistsError, locks_for_vins, vin_directory
+from indexes import VINIndex, AttributeIndex, PriceIndex, OrderedVINs, levenshtein_distance
+from columnar import ColumnarStore
+from reports import SalesLedger
+from reservations import HoldScheduler
+from query import CarQuery
+from reprice import RepriceReport, plan_prices
+from events import EventLog
+from analytics import SalesAnalytics, sale_entry
+
+RENDER_CACHE_SIZE = 1024 # Rendered listings and pages kept per inventory
+COLUMNAR_MIN_CANDIDATES = 2048 # With a columnar copy, searches left with this many candidates,
+COLUMNAR_MIN_SHARE = 8          # and at least 1/8 of the lot, are filtered by NumPy instead
 
 class Inventory:
-    def __init__(self):
+    def __init__(self, columnar: bool = False, name: str = "Main Lot", directory=None):
+        """Set columnar=True to also keep a NumPy struct-of-arrays copy for vectorized filters and reports.
+        Several lots can run side by side; they share one VIN directory (see car.VINDirectory)
+        unless given their own, so a VIN can only be in one of them at a time."""
+        self.name = name
+        self.directory = directory if directory is not None else vin_directory
         self.cars = {}
+        self.columns = ColumnarStore() if columnar else None
+        self.sales = SalesLedger()
+        self.holds = HoldScheduler()
+        self._vin_index = VINIndex()
+        self._attributes = AttributeIndex()
+        self._available_prices = PriceIndex()
+        self._all_vins = OrderedVINs()
+        self._unsold_vins = OrderedVINs()
+        # Every change is also numbered in a ring buffer that consumers can follow; see events.py.
+        # The write methods below wait there for blocking subscribers after letting go of their locks
+        self.events = EventLog()
+        self._listeners = [self.events.record]
+        self._analytics = None
+        # Set to a list by bulk_reprice: repriced cars are collected here and refiled by price in one go
+        self._deferred_prices = None
+        # key -> (version, rendered value); see _render
+        self._renders = {}
+        # Only held while indexes are updated. Car state changes lock per VIN
+        # (see Car.lock) and then take this lock, never the other way round.
+        self._lock = threading.RLock()
+
+    @property
+    def analytics(self):
+        """Sales rollups by period, make and model. Built on first use, kept up to date after.
+        The sales are copied out under the lock but totalled outside it, so a long history
+        does not hold up the lot; changes made meanwhile are caught up from the event log."""
+        if self._analytics is not None:
+            return self._analytics
+        with self._lock:
+            entries = {vin: sale_entry(car) for vin, car in self.cars.items() if car.status == "Sold"}
+            changes = self.events.subscribe()
+        analytics = SalesAnalytics.from_entries(entries)
+        try:
+            with self._lock:
+                if self._analytics is None: # Unless another thread got there first
+                    analytics.catch_up(self, changes)
+                    self.add_listener(analytics._on_inventory_change)
+                    self._analytics = analytics
+                return self._analytics
+        finally:
+            changes.close()
+
+    @property
+    def version(self) -> int:
+        """Goes up with every car added, removed or changed, so anything rendered from the
+        inventory is still current while the version it was rendered at is."""
+        return self.events.last_seq
+
+    def _render(self, key, render):
+        """Returns render(), reusing the value cached under key if nothing has changed since.
+        A change made while rendering moves the version on, so that value is never reused."""
+        version = self.version
+        cached = self._renders.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = render()
+        if len(self._renders) >= RENDER_CACHE_SIZE:
+            self._renders.clear()
+        self._renders[key] = (version, value)
+        return value
+
+    def add_listener(self, callback):
+        """Registers callback(action, car, attribute, old_value), called after a car is
+        "added", "removed" or "changed". attribute and old_value are None unless changed."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def _emit(self, action, car, attribute=None, old_value=None):
+        for callback in self._listeners:
+            callback(action, car, attribute, old_value)
 
     def add_car(self, car):
-        if car.vin in self.cars:
-            return f"Car with VIN {car.vin} already exists."
-        self.cars[car.vin] = car
+        with car.lock(), self._lock:
+            if car.vin in self.cars:
+                return f"Car with VIN {car.vin} already exists."
+            try:
+                self.directory.claim(car.vin, self)
+            except VINExistsError as e:
+                return str(e)
+            self._file_price(car)
+            self._all_vins.add(car.vin)
+            self._file_unsold(car)
+            self._add(car)
+        self.events.wait_for_readers() # Back-pressure, now that no lock is held
         return f"Car with VIN {car.vin} added successfully."
 
+    def add_cars(self, cars):
+        """Adds a batch of cars, skipping VINs already present here or in another lot. Returns how many were added."""
+        cars = list(cars)
+        with ExitStack() as stack:
+            for lock in locks_for_vins(car.vin for car in cars):
+                stack.enter_context(lock)
+            stack.enter_context(self._lock)
+            new_cars = {}
+            for car in cars:
+                if car.vin not in self.cars and car.vin not in new_cars:
+                    try:
+                        self.directory.claim(car.vin, self)
+                    except VINExistsError:
+                        continue
+                    new_cars[car.vin] = car
+            # One sort per ordered index for the whole batch instead of an insort per car
+            self._available_prices.add_many((car.vin, car.price) for car in new_cars.values() if car.is_available())
+            self._all_vins.add_many(new_cars)
+            self._unsold_vins.add_many(vin for vin, car in new_cars.items() if car.status != "Sold")
+            for car in new_cars.values():
+                self._add(car)
+        self.events.wait_for_readers()
+        return len(new_cars)
+
+    def _add(self, car):
+        """Files a car everywhere except the sorted indexes, which the callers fill."""
+        self.cars[car.vin] = car
+        self._vin_index.add(car.vin)
+        self._attributes.add(car)
+        if self.columns is not None:
+            self.columns.add(car)
+        self.sales.record(car)
+        car.watch(self._on_car_changed)
+        self._emit("added", car)
+
     def remove_car(self, vin):
-        if vin in self.cars:
+        car = self.cars.get(vin)
+        if car is None:
+            return f"Car with VIN {vin} not found."
+        with car.lock(), self._lock:
+            if self.cars.get(vin) is not car:
+                return f"Car with VIN {vin} not found."
             del self.cars[vin]
-            return f"Car with VIN {vin} removed."
-        return f"Car with VIN {vin} not found."
+            self.directory.release(vin, self) # The VIN can be used again, here or in another lot
+            car.unwatch(self._on_car_changed)
+            self._vin_index.remove(vin)
+            self._attributes.remove(vin)
+            self._available_prices.remove(vin)
+            self._all_vins.remove(vin)
+            self._unsold_vins.remove(vin)
+            if self.columns is not None:
+                self.columns.remove(vin)
+            self.sales.forget(vin)
+            self._emit("removed", car)
+        self.events.wait_for_readers()
+        return f"Car with VIN {vin} removed."
 
     def update_car(self, vin, **kwargs):
         car = self.cars.get(vin)
         if not car:
             return f"Car with VIN {vin} not found."
-        for key, value in kwargs.items():
-            if hasattr(car, key):
-                setattr(car, key, value)
+        car._update(**{key: value for key, value in kwargs.items() if hasattr(car, key)})
+        self.events.wait_for_readers()
         return f"Car with VIN {vin} updated."
 
+    def checkout(self, vins, sold_on=None, holder=None):
+        """Sells every car in vins, or none of them if any is no longer available.
+        Cars that holder has on hold (see Inventory.holds) count as available to holder, as long
+        as staff have not changed their status since. Every car is checked before any is sold.
+        Returns the sold cars; raises ValueError naming the cars that could not be sold.
+        """
+        vins = list(vins)
+        with ExitStack() as stack:
+            for lock in locks_for_vins(vins):
+                stack.enter_context(lock)
+            cars = [self.cars.get(vin) for vin in vins]
+            unavailable = [
+                vin for vin, car in zip(vins, cars)
+                if car is None or not (car.is_available()
+                                       or (car.status == "Reserved" and self.holds.is_held_by(vin, holder)))
+            ]
+            if unavailable:
+                raise ValueError(f"No longer available: {', '.join(unavailable)}.")
+            for car in cars:
+                held = self.holds.take(car.vin, holder)
+                car.sell(sold_on, allow_reserved=held)
+        self.events.wait_for_readers()
+        return cars
+
+    def _on_car_changed(self, car, attribute, old_value):
+        """Keeps the indexes in step with changes made through the Car itself."""
+        with self._lock:
+            if self.cars.get(car.vin) is not car:
+                return # Removed while the change was in flight
+            if attribute in ("make", "model", "colour", "year"):
+                self._attributes.update(car)
+            elif attribute == "price" and self._deferred_prices is not None:
+                self._deferred_prices.append(car)
+            elif attribute in ("status", "price"):
+                self._file_price(car)
+            if attribute == "status":
+                self._file_unsold(car)
+            if attribute in ("status", "price", "cost", "make", "model"):
+                self.sales.record(car)
+            if self.columns is not None:
+                self.columns.update(car)
+            self._emit("changed", car, attribute, old_value)
+
+    def _cars_for(self, vins):
+        """Looks up cars for VINs read from an index, skipping any removed in the meantime."""
+        cars = self.cars
+        return [car for car in map(cars.get, vins) if car is not None]
+
+    def _file_price(self, car):
+        """Only available cars are kept in the price index."""
+        if car.is_available():
+            self._available_prices.add(car.vin, car.price)
+        else:
+            self._available_prices.remove(car.vin)
+
+    def _file_unsold(self, car):
+        if car.status != "Sold":
+            self._unsold_vins.add(car.vin)
+        else:
+            self._unsold_vins.remove(car.vin)
+
+    def page_inventory(self, page_size: int = 10, cursor: str | None = None, include_sold: bool = False):
+        """Returns one page of cars in VIN order as (cars, next_cursor).
+        Pass next_cursor back in to get the following page; it is None on the last page.
+        """
+        vins = self._all_vins if include_sold else self._unsold_vins
+        page = vins.after(cursor, page_size + 1)
+        next_cursor = page[page_size - 1] if len(page) > page_size else None
+        return self._cars_for(page[:page_size]), next_cursor
+
+    def render_page(self, page_size: int = 10, cursor: str | None = None, include_sold: bool = False):
+        """Like page_inventory, but returns the page as printable text: (text, next_cursor)."""
+        def render():
+            cars, next_cursor = self.page_inventory(page_size, cursor, include_sold)
+            return "\n".join(map(repr, cars)), next_cursor
+        return self._render(("page", page_size, cursor, include_sold), render)
+
+    def iter_inventory(self, include_sold: bool = False, page_size: int = 500):
+        """Yields cars in VIN order one page at a time, without building the whole listing."""
+        cursor = None
+        while True:
+            cars, cursor = self.page_inventory(page_size, cursor, include_sold)
+            yield from cars
+            if cursor is None:
+                return
+
     def list_inventory(self, include_sold=False):
         if not self.cars:
             return "Inventory is empty."
         
-        car_list = self.cars.values()
-        if not include_sold:
-            car_list = [car for car in car_list if car.status != "Sold"]
-
-        if not car_list:
+        vins = self._all_vins if include_sold else self._unsold_vins
+        if not vins:
             return "No available cars in inventory."
             
-        return "\n".join(str(car) for car in car_list)
+        return self._render(("list", include_sold), lambda: "\n".join(map(repr, self.iter_inventory(include_sold))))
 
     def find_car(self, vin):
         return self.cars.get(vin)
 
-    def find_car_by_vin_fuzzy(self, search_vin: str):
+    def find_car_by_vin_fuzzy(self, search_vin: str, max_distance: int | None = None):
         """
         Finds the car with the most similar VIN using Levenshtein distance.
+        If max_distance is given, only VINs within that distance are considered.
         Returns a tuple of (car, distance).
         """
-        if not self.cars:
+        match = self._vin_index.nearest(search_vin.upper(), max_distance)
+        if match is None:
             return None, float('inf')
 
-        best_match_car = None
-        min_distance = float('inf')
+        distance, vin = match
+        car = self.cars.get(vin)
+        if car is None:
+            return None, float('inf')
+        return car, distance
 
-        for vin, car in self.cars.items():
-            distance = levenshtein_distance(search_vin.upper(), vin)
-            if distance < min_distance:
-                min_distance = distance
-                best_match_car = car
-        
-        return best_match_car, min_distance
+    def find_cars_by_vin_within(self, search_vin: str, max_distance: int):
+        """Returns (car, distance) pairs for every VIN within max_distance, best first."""
+        matches = self._vin_index.within(search_vin.upper(), max_distance)
+        return [(car, distance) for car, distance in ((self.cars.get(vin), distance) for distance, vin in matches) if car is not None]
 
     def filter_by_price_range(self, min_price: float, max_price: float):
         """Filters available cars by price range."""
         if min_price > max_price:
             raise ValueError("Minimum price cannot be greater than maximum price.")
         
-        return [
-            car for car in self.cars.values() 
-            if car.is_available() and min_price <= car.price <= max_price
-        ]
+        return self._cars_for(self._available_prices.range(min_price, max_price))
+
+    def cheapest_cars(self, count: int):
+        """Returns up to count available cars, lowest price first."""
+        return self._cars_for(self._available_prices.cheapest(count))
+
+    def most_expensive_cars(self, count: int):
+        """Returns up to count available cars, highest price first."""
+        return self._cars_for(self._available_prices.most_expensive(count))
+
+    def sales_totals(self, sold_from=None, sold_to=None):
+        """Returns (cars sold, revenue, cost of goods sold) across the inventory, or only for
+        cars sold between the given dates (inclusive). Overall totals are kept running by the
+        sales ledger; dated ones come from the columnar copy if kept, or a pass over the cars."""
+        if sold_from is None and sold_to is None:
+            totals = self.sales.overall
+            return totals.units, totals.revenue, totals.cost
+        if self.columns is not None:
+            with self._lock:
+                return self.columns.sales_totals(sold_from, sold_to)
+        units, revenue, cost = 0, 0.0, 0.0
+        for car in list(self.cars.values()):
+            if (car.status == "Sold" and car.sold_date is not None
+                    and (sold_from is None or car.sold_date >= sold_from)
+                    and (sold_to is None or car.sold_date <= sold_to)):
+                units += 1
+                revenue += car.price
+                cost += car.cost
+        return units, revenue, cost
 
     def find_car_by_make_and_model(self, make, model):
         """Finds cars by make and model."""
-        return [car for car in self.cars.values() if car.make.lower() == make.lower() and car.model.lower() == model.lower()]
\ No newline at end of file
+        return self._cars_for(self._attributes.by_make_and_model(make, model))
+
+    def find_cars_by_make(self, make):
+        """Finds cars of any model by the given make."""
+        return self._cars_for(self._attributes.by_make(make))
+
+    def find_cars_by_colour(self, colour):
+        return self._cars_for(self._attributes.by_colour(colour))
+
+    def find_cars_by_year(self, year):
+        return self._cars_for(self._attributes.by_year(year))
+
+    def query(self, make=None, model=None, colour=None, min_year=None, max_year=None, min_price=None,
+              max_price=None, status="Available", sort_by=None, descending=False, limit=None):
+        """Finds cars matching every given criterion; see CarQuery for the options.
+        Starts from whichever index narrows the search most, then checks the rest of the
+        criteria car by car. Raises ValueError for impossible ranges or unknown options.
+        """
+        return self._select(CarQuery(make, model, colour, min_year, max_year, min_price, max_price,
+                                     status, sort_by, descending, limit))
+
+    def _select(self, query):
+        path, _, candidates = self._plan(query)
+        cars = (car for car in map(self.cars.get, candidates()) if car is not None and query.matches(car))
+        # The price index already yields cars in price order, so a price sort needs no sorting at all
+        return query.collect(cars, presorted=path == "price" and query.sort_by == "price")
+
+    def bulk_reprice(self, rule, admin=False, clamp=True, **criteria):
+        """Reprices every car matching criteria (as for query; by default every available car)
+        by rule, a RepriceRule. For sellers (admin=False) a car the rule would take below the
+        minimum profit margin is raised to the minimum price, or with clamp=False rejected.
+        All or nothing: if any car is rejected, or applying a change fails, no price changes.
+        Returns a RepriceReport listing the clamped and rejected cars.
+        """
+        query = CarQuery(**criteria)
+        cars = self._select(query)
+        with ExitStack() as stack:
+            for lock in locks_for_vins(car.vin for car in cars):
+                stack.enter_context(lock)
+            # Checked again under the locks, so each car is judged as it is now
+            cars = [car for car in cars if self.cars.get(car.vin) is car and query.matches(car)]
+            # The margin floor is worked out for the whole batch at once (see reprice.py)
+            new_prices, clamped, rejected = plan_prices(
+                rule, [car.price for car in cars], [car.cost for car in cars],
+                None if admin else Car.MIN_PROFIT_MARGIN, clamp)
+            report = RepriceReport(rule, len(cars))
+            report.clamped = [(cars[i].vin, wanted, new_prices[i]) for i, wanted in clamped]
+            report.rejected = [(cars[i].vin, new_prices[i], reason) for i, reason in rejected]
+            if report.rejected:
+                return report
+
+            applied = []
+            with self._lock:
+                self._deferred_prices = []
+                try:
+                    for car, price in zip(cars, new_prices):
+                        if price != car.price:
+                            applied.append((car, car.price))
+                            car._update(price=price)
+                except BaseException:
+                    for car, old_price in reversed(applied):
+                        car._update(price=old_price)
+                    raise
+                finally:
+                    repriced, self._deferred_prices = self._deferred_prices, None
+                    self._available_prices.add_many((car.vin, car.price) for car in repriced if car.is_available())
+            report.changed = len(applied)
+            report.applied = True
+        self.events.wait_for_readers()
+        return report
+
+    def plan_query(self, **criteria):
+        """Returns (access path, estimated candidates) that query would use for these criteria."""
+        path, estimate, _ = self._plan(CarQuery(**criteria))
+        return path, estimate
+
+    def _plan(self, query):
+        """Picks the access path with the fewest candidate cars, judged from index sizes alone,
+        or the columnar copy (if kept) when even the best index leaves many candidates.
+        Returns (path name, estimated candidates, function producing the candidate VINs)."""
+        attributes = self._attributes
+        paths = [("scan", len(self.cars), lambda: list(self.cars))]
+        if query.make and query.model:
+            paths.append(("make_model", attributes.count_make_and_model(query.make, query.model),
+                          lambda: attributes.by_make_and_model(query.make, query.model)))
+        elif query.make:
+            paths.append(("make", attributes.count_make(query.make), lambda: attributes.by_make(query.make)))
+        if query.colour:
+            paths.append(("colour", attributes.count_colour(query.colour), lambda: attributes.by_colour(query.colour)))
+        if query.has_year_range:
+            min_year, max_year = query.year_bounds()
+            paths.append(("year", attributes.count_years(min_year, max_year),
+                          lambda: attributes.by_years(min_year, max_year)))
+        if query.status == "Available": # The price index holds available cars only
+            min_price, max_price = query.price_bounds()
+            def by_price():
+                vins = self._available_prices.range(min_price, max_price)
+                return reversed(vins) if query.descending else vins
+            paths.append(("price", self._available_prices.count(min_price, max_price), by_price))
+        best = min(paths, key=lambda path: path[1])
+        if (self.columns is not None and best[1] >= COLUMNAR_MIN_CANDIDATES
+                and best[1] * COLUMNAR_MIN_SHARE >= len(self.cars)):
+            # Too many candidates to check car by car: the columnar copy checks every
+            # criterion for every row in a few vectorized passes instead
+            def by_columns():
+                with self._lock: # Rows move when a car is removed, so read them all at once
+                    return self.columns.filter(
+                        make=query.make, model=query.model, colour=query.colour, status=query.status,
+                        min_year=query.min_year, max_year=query.max_year,
+                        min_price=query.min_price, max_price=query.max_price)
+            return "columnar", best[1], by_columns
+        return best
@@ -6,10 +6,29 @@
  000563621
 '''
 from car import Car, VINExistsError, PermissionError
+from console import input, print
 from inventory import Inventory
-from auth import User, UserManager
+from auth import User, UserManager, SESSION_SECONDS
 from ecommerce import Cart, Payment, Notification, Delivery
+from fulfilment import fulfilment, new_order
+from storage import DataStore
+from importer import import_cars
+from instrumentation import metrics
+from analytics import PERIODS, write_csv
+from replay import ScriptError, ScriptRunner, read_script
+from contextlib import ExitStack
+from datetime import date
+import argparse
+import cProfile
+import os
+import pstats
 import sys
+import tempfile
+
+# Journal and snapshot files are kept next to this file so data survives a restart
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dealership_data")
+# Number of cars shown per screen when listing the inventory
+PAGE_SIZE = 10
 
 # ============================================================
 # Helper Functions for Input Validation & UI
@@ -30,6 +49,17 @@ def get_valid_price(prompt: str) -> float:
         except ValueError:
             print("Invalid input. Price must be a number.")
 
+def get_optional_number(prompt: str, cast=float):
+    """Like get_valid_price, but a blank answer returns None for "no limit"."""
+    while True:
+        text = input(prompt).strip().replace("$", "").replace(",", "")
+        if not text:
+            return None
+        try:
+            return cast(text)
+        except ValueError:
+            print("Invalid input. Enter a number, or leave blank for no limit.")
+
 def get_valid_vin() -> str:
     while True:
         vin = input("Enter car VIN: ").strip().upper()
@@ -42,6 +72,33 @@ def print_header(title: str):
     print(f" {title.upper()} ".center(40, "="))
     print("=" * 40)
 
+def print_inventory_page(inventory: Inventory, cursor: str | None, include_sold: bool = False) -> str | None:
+    """Prints one page of the inventory and returns the cursor for the next page, if any."""
+    text, next_cursor = inventory.render_page(PAGE_SIZE, cursor, include_sold)
+    print(text or ("No available cars in inventory." if inventory.cars else "Inventory is empty."))
+    return next_cursor
+
+def browse_pages(inventory: Inventory, include_sold: bool = False):
+    """Shows the inventory one page at a time until the user quits."""
+    cursors: list[str | None] = [None]
+    while True:
+        next_cursor = print_inventory_page(inventory, cursors[-1], include_sold)
+        if next_cursor is None and len(cursors) == 1:
+            return # Everything fit on one page
+        options = []
+        if next_cursor:
+            options.append("(n)ext")
+        if len(cursors) > 1:
+            options.append("(p)revious")
+        options.append("(q)uit")
+        choice = input(f"Page {len(cursors)} - {', '.join(options)}: ").strip().lower()
+        if choice == 'n' and next_cursor:
+            cursors.append(next_cursor)
+        elif choice == 'p' and len(cursors) > 1:
+            cursors.pop()
+        elif choice == 'q':
+            return
+
 def find_car_with_suggestion(inventory: Inventory, vin: str) -> Car | None:
     """
     Finds a car by VIN. Tries an exact match first, then falls back to a
@@ -55,10 +112,10 @@ def find_car_with_suggestion(inventory: Inventory, vin: str) -> Car | None:
 
     # 2. If not found, try fuzzy search
     print("Exact VIN not found. Searching for similar VINs...")
-    suggested_car, distance = inventory.find_car_by_vin_fuzzy(vin)
+    suggested_car, distance = inventory.find_car_by_vin_fuzzy(vin, max_distance=3) # Threshold of 3 seems reasonable
 
     # 3. If a close match is found, suggest it to the user
-    if suggested_car and distance <= 3: # Threshold of 3 seems reasonable
+    if suggested_car and distance <= 3:
         print(f"Did you mean VIN '{suggested_car.vin}'?")
         print(f"Details: {suggested_car}")
         confirm = input("Is this the correct car? (y/n): ").strip().lower()
@@ -73,47 +130,65 @@ def find_car_with_suggestion(inventory: Inventory, vin: str) -> Car | None:
 # ============================================================
 
 def handle_buyer_actions(current_user: User, inventory: Inventory):
-    cart = Cart(current_user)
-    while True:
-        print_header("Buyer Menu")
-        print("1. Browse and Filter Cars")
-        print("2. View and Manage Cart")
-        print("3. Checkout")
-        print("4. Back to Main Menu")
-        choice = input("Choose an option: ").strip()
+    cart = Cart(current_user, inventory.holds)
+    try:
+        while True:
+            print_header("Buyer Menu")
+            print("1. Browse and Filter Cars")
+            print("2. View and Manage Cart")
+            print("3. Checkout")
+            print("4. Back to Main Menu")
+            choice = input("Choose an option: ").strip()
 
-        if choice == '1':
-            handle_browsing(inventory, cart)
-        elif choice == '2':
-            handle_cart_management(cart)
-        elif choice == '3':
-            if not cart.items:
-                print("Your cart is empty. Add items before checking out.")
-                continue
-            
-            payment_successful = handle_checkout(current_user, cart, inventory)
-            if payment_successful:
-                cart = Cart(current_user) # Reset cart ONLY on successful purchase
-        elif choice == '4':
-            break
-        else:
-            print("Invalid option.")
+            if choice == '1':
+                handle_browsing(inventory, cart)
+            elif choice == '2':
+                handle_cart_management(cart)
+            elif choice == '3':
+                if not cart.items:
+                    print("Your cart is empty. Add items before checking out.")
+                    continue
+                
+                payment_successful = handle_checkout(current_user, cart, inventory)
+                if payment_successful:
+                    cart.clear()
+                    cart = Cart(current_user, inventory.holds) # Reset cart ONLY on successful purchase
+            elif choice == '4':
+                break
+            else:
+                print("Invalid option.")
+    finally:
+        cart.clear() # Leaving the portal (or hanging up) releases any cars still held
 
 def handle_browsing(inventory: Inventory, cart: Cart):
+    cursors: list[str | None] = [None] # Cursor of every page visited, so we can go back
     while True:
-        print_header("Browse Cars")
-        print(inventory.list_inventory())
+        print_header(f"Browse Cars (Page {len(cursors)})")
+        next_cursor = print_inventory_page(inventory, cursors[-1])
         print("\nFilter & Action:")
+        if next_cursor:
+            print("N. Next Page")
+        if len(cursors) > 1:
+            print("P. Previous Page")
         print("1. Filter by Make and Model")
         print("2. Filter by Price Range")
-        print("3. Add a Car to Cart")
-        print("4. Back to Buyer Menu")
-        choice = input("Choose an option: ").strip()
-
-        if choice == '1':
+        print("3. Search with Several Filters")
+        print("4. Show Cheapest or Most Expensive Cars")
+        print("5. Add a Car to Cart")
+        print("6. Back to Buyer Menu")
+        choice = input("Choose an option: ").strip().lower()
+
+        if choice == 'n' and next_cursor:
+            cursors.append(next_cursor)
+        elif choice == 'p' and len(cursors) > 1:
+            cursors.pop()
+        elif choice == '1':
             make = input("Enter make: ").strip()
-            model = input("Enter model: ").strip()
-            results = inventory.find_car_by_make_and_model(make, model)
+            model = input("Enter model (leave blank for all models): ").strip()
+            if model:
+                results = inventory.find_car_by_make_and_model(make, model)
+            else:
+                results = inventory.find_cars_by_make(make)
             print("\n--- Filter Results ---")
             if results:
                 for car in results: print(car)
@@ -132,17 +207,58 @@ def handle_browsing(inventory: Inventory, cart: Cart):
             except ValueError as e:
                 print(f"Error: {e}")
         elif choice == '3':
+            handle_combined_search(inventory)
+        elif choice == '4':
+            order = input("Show (c)heapest or (m)ost expensive? ").strip().lower()
+            count_str = input("How many cars? ").strip()
+            count = int(count_str) if count_str.isdigit() else 5
+            if order == 'm':
+                results = inventory.most_expensive_cars(count)
+            else:
+                results = inventory.cheapest_cars(count)
+            print("\n--- Price Results ---")
+            if results:
+                for car in results: print(car)
+            else:
+                print("No available cars in inventory.")
+        elif choice == '5':
             vin = get_valid_vin()
             car = find_car_with_suggestion(inventory, vin)
             if car:
                 cart.add_item(car)
             else:
                 print("Car with that VIN not found.")
-        elif choice == '4':
+        elif choice == '6':
             break
         else:
             print("Invalid option.")
 
+def handle_combined_search(inventory: Inventory):
+    print("\nLeave any filter blank to allow everything.")
+    make = input("Make: ").strip() or None
+    model = input("Model: ").strip() or None
+    colour = input("Colour: ").strip() or None
+    min_year = get_optional_number("Oldest year: ", int)
+    max_year = get_optional_number("Newest year: ", int)
+    min_price = get_optional_number("Minimum price: ")
+    max_price = get_optional_number("Maximum price: ")
+    sort_choice = input("Sort by (p)rice, (y)ear or (m)ake? ").strip().lower()
+    sort_by = {"p": "price", "y": "year", "m": "make"}.get(sort_choice[:1])
+    descending = sort_by is not None and input("Highest first? (y/n): ").strip().lower() == 'y'
+    limit = get_optional_number("How many results at most? ", int)
+    try:
+        results = inventory.query(make=make, model=model, colour=colour, min_year=min_year, max_year=max_year,
+                                  min_price=min_price, max_price=max_price, sort_by=sort_by,
+                                  descending=descending, limit=limit)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    print("\n--- Search Results ---")
+    if results:
+        for car in results: print(car)
+    else:
+        print("No available cars match all of those filters.")
+
 def handle_cart_management(cart: Cart):
     while True:
         cart.display()
@@ -175,12 +291,21 @@ def handle_checkout(user: User, cart: Cart, inventory: Inventory) -> bool:
 
     payment = Payment()
     if payment.process(total):
-        # Mark all items in cart as sold
-        for car in cart.items.values():
-            car.sell()
+        # Sell every car in the cart together, or none of them if another terminal got there first
+        try:
+            inventory.checkout(cart.items, holder=cart)
+        except ValueError as e:
+            print(f"\nSorry, your order could not be completed. {e}")
+            print("Your payment has been refunded. Unavailable cars have been removed from your cart.")
+            for vin, car in list(cart.items.items()):
+                if not (car.is_available() or cart.is_holding(vin)):
+                    cart.remove_item(vin)
+            return False
         
-        Notification.send_order_confirmation(user, cart)
-        Delivery.schedule()
+        # Only the details are gathered here; emails and the delivery booking are sent in the background
+        order = new_order(user.full_name or user.username, cart.items.values(), total)
+        delivery = Delivery.schedule()
+        Notification.send_order_confirmation(user, order, delivery)
         print("\nThank you for your purchase!")
         return True
     else:
@@ -200,40 +325,20 @@ def handle_seller_admin_actions(current_user: User, inventory: Inventory, user_m
             print("6. Permanently Remove Sold Car Record")
             print("7. User Management")
             print("8. Generate Reports")
+            print("9. Import Cars from File (CSV/JSONL)")
+            print("10. Performance Statistics")
+            print("11. Sales Analytics")
         print("0. Back to Main Menu")
         
         choice = input("Choose an option: ").strip()
 
         if choice == '1':
             print_header("Full Inventory Listing")
-            print(inventory.list_inventory(include_sold=True))
+            browse_pages(inventory, include_sold=True)
         elif choice == '2':
-            vin = get_valid_vin()
-            car = find_car_with_suggestion(inventory, vin)
-            if car:
-                try:
-                    new_price = get_valid_price(f"Enter new price for {vin} (current: ${car.price:,.2f}): ")
-                    car.update_price(new_price, admin=is_admin)
-                    print("Price updated successfully.")
-                except (ValueError, PermissionError) as e:
-                    print(f"Error: {e}")
-            else:
-                print("Car not found.")
+            handle_update_price(inventory, is_admin)
         elif choice == '3':
-            vin = get_valid_vin()
-            car = find_car_with_suggestion(inventory, vin)
-            if car:
-                try:
-                    status_in = input("Enter new status (Available, Reserved, Sold): ").strip().title()
-                    if status_in in ["Available", "Reserved", "Sold"]:
-                        car.update_status(status_in, admin=is_admin) # type: ignore
-                        print("Status updated successfully.")
-                    else:
-                        print("Invalid status entered.")
-                except (ValueError, PermissionError) as e:
-                    print(f"Error: {e}")
-            else:
-                print("Car not found.")
+            handle_update_status(inventory, is_admin)
         elif choice == '4' and is_admin:
             try:
                 print_header("Add New Car")
@@ -245,8 +350,7 @@ def handle_seller_admin_actions(current_user: User, inventory: Inventory, user_m
                 cost = get_valid_price("Enter dealership cost: ")
                 price = get_valid_price("Enter selling price: ")
                 new_car = Car(vin=vin, year=year, make=make, model=model, colour=colour, cost=cost, price=price)
-                inventory.add_car(new_car)
-                print(f"\nSuccessfully added new car: {new_car.make} {new_car.model}")
+                print(f"\n{inventory.add_car(new_car)}")
             except (ValueError, VINExistsError) as e:
                 print(f"Error adding car: {e}")
         elif choice == '5' and is_admin:
@@ -258,11 +362,50 @@ def handle_seller_admin_actions(current_user: User, inventory: Inventory, user_m
             handle_user_management(user_manager)
         elif choice == '8' and is_admin:
             handle_reports(inventory)
+        elif choice == '9' and is_admin:
+            handle_import(inventory)
+        elif choice == '10' and is_admin:
+            handle_performance_stats()
+        elif choice == '11' and is_admin:
+            handle_sales_analytics(inventory)
         elif choice == '0':
             break
         else:
             print("Invalid option or insufficient permissions.")
 
+def handle_update_price(inventory: Inventory, is_admin: bool) -> bool:
+    vin = get_valid_vin()
+    car = find_car_with_suggestion(inventory, vin)
+    if not car:
+        print("Car not found.")
+        return False
+    try:
+        new_price = get_valid_price(f"Enter new price for {vin} (current: ${car.price:,.2f}): ")
+        car.update_price(new_price, admin=is_admin)
+        print("Price updated successfully.")
+        return True
+    except (ValueError, PermissionError) as e:
+        print(f"Error: {e}")
+        return False
+
+def handle_update_status(inventory: Inventory, is_admin: bool) -> bool:
+    vin = get_valid_vin()
+    car = find_car_with_suggestion(inventory, vin)
+    if not car:
+        print("Car not found.")
+        return False
+    try:
+        status_in = input("Enter new status (Available, Reserved, Sold): ").strip().title()
+        if status_in not in ["Available", "Reserved", "Sold"]:
+            print("Invalid status entered.")
+            return False
+        car.update_status(status_in, admin=is_admin) # type: ignore
+        print("Status updated successfully.")
+        return True
+    except (ValueError, PermissionError) as e:
+        print(f"Error: {e}")
+        return False
+
 def handle_edit_car(inventory: Inventory):
     print_header("Edit Car (Admin)")
     vin = get_valid_vin()
@@ -286,6 +429,20 @@ def handle_edit_car(inventory: Inventory):
     except (ValueError, PermissionError) as e:
         print(f"Error updating car: {e}")
 
+def handle_import(inventory: Inventory) -> bool:
+    print_header("Import Cars (Admin)")
+    path = input("Enter path to a .csv or .jsonl file: ").strip()
+    try:
+        report = import_cars(path, inventory)
+    except (OSError, ValueError) as e:
+        print(f"Error importing cars: {e}")
+        return False
+
+    print(report.summary())
+    for rejected in report.rejected:
+        print(f"- Line {rejected.line} ({rejected.vin or 'no VIN'}): {rejected.reason}")
+    return True
+
 def handle_user_management(user_manager: UserManager):
     print_header("User Management (Admin)")
     while True:
@@ -316,46 +473,158 @@ def handle_user_management(user_manager: UserManager):
 
 def handle_reports(inventory: Inventory):
     print_header("Generate Reports (Admin)")
-    sold_cars = [car for car in inventory.cars.values() if car.status == "Sold"]
+    cars_sold, total_revenue, total_cost = inventory.sales_totals()
     
-    if not sold_cars:
+    if not cars_sold:
         print("No sales data available to generate reports.")
         return
 
-    total_revenue = sum(car.price for car in sold_cars)
-    total_cost = sum(car.cost for car in sold_cars)
     total_profit = total_revenue - total_cost
 
     print("\n--- Sales and Profit Report ---")
-    print(f"Total Cars Sold: {len(sold_cars)}")
+    print(f"Total Cars Sold: {cars_sold}")
     print(f"Total Revenue: ${total_revenue:,.2f}")
     print(f"Total Cost of Goods Sold: ${total_cost:,.2f}")
     print(f"Total Profit: ${total_profit:,.2f}")
+
+    today = date.today()
+    for label, sold_from in (("This Month", today.replace(day=1)), ("Year to Date", today.replace(month=1, day=1))):
+        units, revenue, cost = inventory.sales_totals(sold_from, today)
+        print(f"{label}: {units} sold | Revenue ${revenue:,.2f} | Profit ${revenue - cost:,.2f}")
+
+    print("\n--- Sales by Make ---")
+    for totals in list(inventory.sales.by_make.values()):
+        print(f"{totals.label}: {totals.units} sold | Revenue ${totals.revenue:,.2f} | Profit ${totals.profit:,.2f}")
+
+    print("\n--- Sales by Model ---")
+    for totals in list(inventory.sales.by_model.values()):
+        print(f"{totals.label}: {totals.units} sold | Revenue ${totals.revenue:,.2f} | Profit ${totals.profit:,.2f}")
     print("---------------------------------")
 
+def handle_sales_analytics(inventory: Inventory):
+    analytics = inventory.analytics
+    while True:
+        print_header("Sales Analytics")
+        print("1. Show Sales by Period")
+        print("2. Export Sales by Period to CSV")
+        print("0. Back to Admin Menu")
+        choice = input("Choose an option: ").strip()
+        if choice == '0':
+            break
+        if choice not in ('1', '2'):
+            print("Invalid option.")
+            continue
+
+        period = input(f"Period ({'/'.join(PERIODS)}) [month]: ").strip().lower() or "month"
+        by = {"1": "all", "2": "make", "3": "model"}.get(
+            input("Group by: 1. Nothing  2. Make  3. Model [1]: ").strip() or "1", "all")
+        start = input("From period (e.g. 2025-Q3, blank for the first): ").strip() or None
+        end = input("To period (blank for the same as From, or the latest if From is blank): ").strip() or start
+        try:
+            rows = analytics.rollup(period, by, start, end)
+        except ValueError as e:
+            print(f"Error: {e}")
+            continue
+        if not rows:
+            print("No sales in that range.")
+            continue
+
+        if choice == '1':
+            print(f"\n{'Period':<12}{'Group':<24}{'Sold':>6}{'Revenue':>16}{'Profit':>14}{'Margin':>8}{'Median':>8}")
+            for row in rows:
+                cell = row.cell
+                print(f"{row.period:<12}{row.group[:23]:<24}{cell.units:>6}{cell.revenue:>16,.2f}{cell.profit:>14,.2f}"
+                      f"{cell.margin:>7.1f}%{cell.margin_percentile(0.5):>7.1f}%")
+        else:
+            path = input("Save CSV to (e.g., sales.csv): ").strip()
+            if not path:
+                continue
+            try:
+                print(f"Wrote {write_csv(rows, path)} rows to {path}.")
+            except OSError as e:
+                print(f"Could not write {path}: {e}")
+
+def handle_performance_stats():
+    while True:
+        print_header("Performance Statistics")
+        print(f"Instrumentation is {'ON' if metrics.enabled else 'OFF'}.")
+        summary = metrics.summary()
+        if summary:
+            print(f"\n{'Operation':<38}{'Calls':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+            for name, row in summary.items():
+                print(f"{name:<38}{row['calls']:>7}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['p99_ms']:>10.3f}")
+        else:
+            print("No measurements recorded yet.")
+
+        print("\n1. Turn Instrumentation On/Off")
+        print("2. Reset Measurements")
+        print("3. Save Measurements to File")
+        print("0. Back to Admin Menu")
+        choice = input("Choose an option: ").strip()
+
+        if choice == '1':
+            if metrics.enabled:
+                metrics.disable()
+            else:
+                metrics.enable(sys.modules[__name__])
+        elif choice == '2':
+            metrics.reset()
+        elif choice == '3':
+            path = input("Enter file name (e.g., metrics.json): ").strip() or "metrics.json"
+            try:
+                metrics.dump(path)
+                print(f"Measurements saved to {path}.")
+            except OSError as e:
+                print(f"Error saving measurements: {e}")
+        elif choice == '0':
+            break
+        else:
+            print("Invalid option.")
+
 # ============================================================
 # Main Program Execution
 # ============================================================
 
-def main():
+def open_dealership(data_dir: str = DATA_DIR, columnar: bool = False) -> tuple[Inventory, UserManager, DataStore]:
+    """Restores the users and inventory saved by the last run, seeding sample data on the first run.
+    Changes are journaled from here on and orders are fulfilled into data_dir/outbox;
+    close the returned DataStore and the fulfilment pipeline when finished.
+    columnar=True also keeps the NumPy columnar copy of the lot (see columnar.py)."""
+    user_manager = UserManager()
+    inventory = Inventory(columnar=columnar)
+    data_store = DataStore(data_dir)
+    has_saved_data = data_store.load(inventory, user_manager)
+    data_store.attach(inventory, user_manager)
+    fulfilment.start(os.path.join(data_dir, "outbox"))
+
+    if not has_saved_data:
+        user_manager.populate_default_users()
+        try:
+            inventory.add_car(Car(vin="VIN123", year=2021, make="Honda", model="Civic", colour="Blue", cost=20000, price=22000.0))
+            inventory.add_car(Car(vin="VIN456", year=2022, make="Ford", model="Mustang", colour="Red", cost=40000, price=45000.0))
+            inventory.add_car(Car("VIN101", 2022, "Toyota", "Camry", "Silver", 25000, 28000))
+        except (ValueError, VINExistsError) as e:
+            print(f"Error pre-populating data: {e}")
+    return inventory, user_manager, data_store
+
+def main(columnar: bool = False):
     """Main function to run the car dealership simulation."""
     print_header("E-Commerce Car Dealership Simulation")
 
-    # Setup Users and Inventory
-    user_manager = UserManager()
-    user_manager.populate_default_users()
-
-    inventory = Inventory()
+    inventory, user_manager, data_store = open_dealership(columnar=columnar)
     try:
-        inventory.add_car(Car(vin="VIN123", year=2021, make="Honda", model="Civic", colour="Blue", cost=20000, price=22000.0))
-        inventory.add_car(Car(vin="VIN456", year=2022, make="Ford", model="Mustang", colour="Red", cost=40000, price=45000.0))
-        inventory.add_car(Car("VIN101", 2022, "Toyota", "Camry", "Silver", 25000, 28000))
-    except (ValueError, VINExistsError) as e:
-        print(f"Error pre-populating data: {e}")
+        run_main_menu(inventory, user_manager)
+    finally:
+        fulfilment.close()
+        data_store.close()
+
+    print("\nExiting program. Goodbye!")
 
+def run_main_menu(inventory: Inventory, user_manager: UserManager, terminal: str = "local"):
+    """Runs the login and portal menu until the user chooses to exit.
+    terminal identifies where the session is coming from, for login rate limiting."""
     current_user: User | None = None
-    login_attempts = 0
-    MAX_LOGIN_ATTEMPTS = 3
+    session_token: str | None = None
 
     while True:
         print_header("Main Menu")
@@ -366,7 +635,7 @@ def main():
                 print("2. Enter Staff Portal (Admin/Seller)")
             print("3. Logout")
         else:
-            if login_attempts < MAX_LOGIN_ATTEMPTS:
+            if not user_manager.lockout_remaining(terminal=terminal):
                 print("1. Login")
             else:
                 print("1. Login (Locked due to too many failed attempts)")
@@ -382,36 +651,106 @@ def main():
                 handle_seller_admin_actions(current_user, inventory, user_manager)
             elif choice == '3':
                 print(f"Logging out {current_user.username}.")
-                current_user = None
-                login_attempts = 0 # Reset attempts on logout
+                user_manager.end_session(session_token)
+                current_user = session_token = None
             elif choice == '0':
+                user_manager.end_session(session_token)
                 break
             else:
                 print("Invalid option.")
         else: # Not logged in
             if choice == '1':
-                if login_attempts >= MAX_LOGIN_ATTEMPTS:
-                    print("You have been temporarily locked out.")
+                wait = user_manager.lockout_remaining(terminal=terminal)
+                if wait:
+                    print(f"You have been temporarily locked out. Try again in {wait:.0f} seconds.")
                     continue
-                
-                name = input("Enter username: ").strip().lower()
-                user = user_manager.get_user(name)
-                if user and user.login():
+
+                name = input("Enter username (or resume code): ").strip()
+                user = user_manager.resume_session(name)
+                if user: # Re-entry after a dropped connection; no password check needed
+                    print(f"Welcome back, {user.username}!")
+                    current_user, session_token = user, name
+                    continue
+
+                name = name.lower()
+                wait = user_manager.lockout_remaining(username=name)
+                if wait:
+                    print(f"Too many failed attempts for this account. Try again in {wait:.0f} seconds.")
+                    continue
+                user = user_manager.login(name, terminal)
+                if user:
                     current_user = user
-                    login_attempts = 0 # Reset on success
+                    session_token = user_manager.start_session(user)
+                    print(f"Your resume code is {session_token} - if you are disconnected, enter it as your username "
+                          f"within {SESSION_SECONDS // 60} minutes to carry on.")
                 else:
-                    login_attempts += 1
-                    remaining = MAX_LOGIN_ATTEMPTS - login_attempts
+                    remaining = max(0, user_manager.attempts_remaining(name, terminal))
                     print(f"Login failed. You have {remaining} attempts remaining.")
             elif choice == '2':
                 print_header("Public Inventory")
-                print(inventory.list_inventory())
+                browse_pages(inventory)
             elif choice == '0':
                 break
             else:
                 print("Invalid option.")
 
-    print("\nExiting program. Goodbye!")
+def replay(script: str, data_dir: str | None = None, results: str | None = None, echo: bool = False,
+           columnar: bool = False) -> bool:
+    """Runs a JSONL command script (see replay.py) through the menu handlers and prints
+    a timing summary. Without data_dir it runs on a fresh copy of the sample data, so
+    the saved dealership is never touched. Returns False if any command ended differently
+    than the script expected (an error counts unless "expect" says "error")."""
+    with tempfile.TemporaryDirectory() as scratch, ExitStack() as files:
+        lines = files.enter_context(open(script, encoding="utf-8"))
+        results_file = files.enter_context(open(results, "w", encoding="utf-8")) if results else None
+        inventory, user_manager, data_store = open_dealership(data_dir or scratch, columnar)
+        try:
+            runner = ScriptRunner(sys.modules[__name__], inventory, user_manager, echo)
+            report = runner.run(read_script(lines), results_file)
+        except ScriptError as e:
+            print(f"Replay stopped: {e}")
+            return False
+        finally:
+            fulfilment.close()
+            data_store.close()
+
+    print_header("Replay Summary")
+    print(report.summary())
+    return not report.unexpected
+
+def run(argv: list[str] | None = None):
+    """Parses the command line, then runs the simulation with any requested measuring turned on."""
+    parser = argparse.ArgumentParser(description="Terminal car dealership simulation.")
+    parser.add_argument("--instrument", action="store_true", help="Record call counts and latencies from the start")
+    parser.add_argument("--profile", metavar="FILE", help="Run the whole session under cProfile and save the stats to FILE")
+    parser.add_argument("--replay", metavar="SCRIPT", help="Run the commands in a JSONL script instead of the menus")
+    parser.add_argument("--results", metavar="FILE", help="With --replay, write each command's outcome and timing as JSONL")
+    parser.add_argument("--data-dir", help="With --replay, run against this data directory instead of a scratch copy")
+    parser.add_argument("--echo", action="store_true", help="With --replay, show the screens as the script runs")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Keep a NumPy columnar copy of the lot for broad searches and dated sales totals "
+                             "(needs NumPy; costs memory per car, pays off on large lots)")
+    args = parser.parse_args(argv)
+
+    def session():
+        main(args.columnar)
+    if args.replay:
+        def session():
+            if not replay(args.replay, args.data_dir, args.results, args.echo, args.columnar):
+                sys.exit(1)
+    if args.instrument:
+        metrics.enable(sys.modules[__name__])
+    if not args.profile:
+        session()
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(session)
+    finally:
+        profiler.dump_stats(args.profile)
+        print(f"\nProfile saved to {args.profile}. Top functions by cumulative time:")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run()
\ No newline at end of file
@@ -0,0 +1,115 @@
+# promotions.py
+""" The promotions module defines the discount codes buyers can apply at checkout.
+    A promotion is made of rules, each taking a percentage and/or a fixed amount off
+    every car in its scope: the whole lot, one make, one model or one price tier.
+    Codes marked exclusive cannot be combined with any other code; the rest stack.
+
+    The rules are compiled once into a table keyed by code and car attribute, so
+    working out a car's discount is a handful of dictionary lookups."""
+from __future__ import annotations
+from bisect import bisect_right
+from typing import Iterable
+
+# (lower price bound, tier name); a car belongs to the last tier whose bound it reaches
+PRICE_TIERS = [(0, "economy"), (25_000, "standard"), (45_000, "premium")]
+# Car attributes a discount can depend on; a change to any of them can change the discount
+DISCOUNT_ATTRIBUTES = frozenset({"make", "model", "price"})
+
+class DiscountRule:
+    """Takes percent% and/or amount dollars off each car in scope. A scope of make and
+    model together targets one model; tier is one of the PRICE_TIERS names."""
+    __slots__ = ("percent", "amount", "make", "model", "tier")
+
+    def __init__(self, percent: float = 0.0, amount: float = 0.0, make: str | None = None,
+                 model: str | None = None, tier: str | None = None):
+        if percent < 0 or percent > 100 or amount < 0:
+            raise ValueError("A discount must be between 0 and 100 percent and not a negative amount.")
+        if model and not make:
+            raise ValueError("A model-scoped discount needs its make as well.")
+        if sum(1 for scope in (make, tier) if scope) > 1:
+            raise ValueError("A discount can be scoped to a make/model or a price tier, not both.")
+        self.percent = percent
+        self.amount = amount
+        self.make = make
+        self.model = model
+        self.tier = tier
+
+    def key(self) -> tuple:
+        """The attribute key this rule is filed under in the compiled table."""
+        if self.model:
+            return ("model", self.make.casefold(), self.model.casefold())
+        if self.make:
+            return ("make", self.make.casefold())
+        if self.tier:
+            return ("tier", self.tier)
+        return ("all",)
+
+    def amount_off(self, price: float) -> float:
+        return price * self.percent / 100 + self.amount
+
+class Promotion:
+    """A discount code and the rules it applies."""
+    __slots__ = ("code", "description", "rules", "exclusive")
+
+    def __init__(self, code: str, description: str, rules: Iterable[DiscountRule], exclusive: bool = False):
+        self.code = code.upper()
+        self.description = description
+        self.rules = tuple(rules)
+        self.exclusive = exclusive
+
+DEFAULT_PROMOTIONS = [
+    Promotion("SAVE10", "10% off every car", [DiscountRule(percent=10)], exclusive=True),
+    Promotion("VIP15", "15% off every car for VIP buyers", [DiscountRule(percent=15)], exclusive=True),
+    Promotion("TOYOTA500", "$500 off any Toyota", [DiscountRule(amount=500, make="Toyota")]),
+    Promotion("CIVIC5", "5% off a Honda Civic", [DiscountRule(percent=5, make="Honda", model="Civic")]),
+    Promotion("BUDGET1000", "$1,000 off economy cars", [DiscountRule(amount=1000, tier="economy")]),
+    Promotion("PREMIUM3", "3% off premium cars, plus $250 off any BMW",
+              [DiscountRule(percent=3, tier="premium"), DiscountRule(amount=250, make="BMW")]),
+]
+
+class PromotionBook:
+    """The promotions on offer, compiled into a code -> attribute key -> rules table."""
+    def __init__(self, promotions: Iterable[Promotion] = DEFAULT_PROMOTIONS, tiers: list[tuple[float, str]] = PRICE_TIERS):
+        self._bounds = [bound for bound, _ in tiers]
+        self._tier_names = [name for _, name in tiers]
+        self._promotions: dict[str, Promotion] = {}
+        self._table: dict[str, dict[tuple, list[DiscountRule]]] = {}
+        for promotion in promotions:
+            self.add(promotion)
+
+    def add(self, promotion: Promotion):
+        """Puts a promotion on offer, replacing any existing one with the same code."""
+        for rule in promotion.rules:
+            if rule.tier and rule.tier not in self._tier_names:
+                raise ValueError(f"Unknown price tier '{rule.tier}'.")
+        table: dict[tuple, list[DiscountRule]] = {}
+        for rule in promotion.rules:
+            table.setdefault(rule.key(), []).append(rule)
+        self._promotions[promotion.code] = promotion
+        self._table[promotion.code] = table
+
+    def get(self, code: str) -> Promotion | None:
+        return self._promotions.get(code.upper())
+
+    def list_promotions(self) -> list[Promotion]:
+        return list(self._promotions.values())
+
+    def tier_of(self, price: float) -> str:
+        return self._tier_names[max(0, bisect_right(self._bounds, price) - 1)]
+
+    def discount_for(self, codes: Iterable[str], car) -> float:
+        """Dollars the given codes take off car together, never more than its price."""
+        make = car.make.casefold()
+        keys = (("all",), ("make", make), ("model", make, car.model.casefold()), ("tier", self.tier_of(car.price)))
+        total = 0.0
+        for code in codes:
+            table = self._table.get(code)
+            if table is None:
+                continue
+            for key in keys:
+                for rule in table.get(key, ()):
+                    total += rule.amount_off(car.price)
+        return min(total, car.price)
+
+# The promotions every cart uses unless it is given its own book
+promotions = PromotionBook()
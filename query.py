@@ -0,0 +1,91 @@
+# query.py
+""" The query module describes multi-criteria car searches for Inventory.query.
+    A CarQuery holds the criteria, checks a car against them and puts the
+    matches in the requested order; the Inventory decides which index to start
+    from, and streams its candidates through the query."""
+import heapq
+from itertools import islice
+
+SORT_KEYS = {
+    "price": lambda car: (car.price, car.vin),
+    "year": lambda car: (car.year, car.vin),
+    "make": lambda car: (car.make.casefold(), car.model.casefold(), car.vin),
+    "vin": lambda car: car.vin,
+}
+STATUSES = ("Available", "Reserved", "Sold")
+
+class CarQuery:
+    """The criteria of one search. Any criterion left as None matches every car."""
+    __slots__ = ("make", "model", "colour", "min_year", "max_year", "min_price", "max_price",
+                 "status", "sort_by", "descending", "limit")
+
+    def __init__(self, make: str | None = None, model: str | None = None, colour: str | None = None,
+                 min_year: int | None = None, max_year: int | None = None,
+                 min_price: float | None = None, max_price: float | None = None,
+                 status: str | None = "Available", sort_by: str | None = None,
+                 descending: bool = False, limit: int | None = None):
+        if min_year is not None and max_year is not None and min_year > max_year:
+            raise ValueError("Minimum year cannot be greater than maximum year.")
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise ValueError("Minimum price cannot be greater than maximum price.")
+        if status is not None and status not in STATUSES:
+            raise ValueError(f"Status must be one of {', '.join(STATUSES)}.")
+        if sort_by is not None and sort_by not in SORT_KEYS:
+            raise ValueError(f"Results can be sorted by {', '.join(SORT_KEYS)}.")
+        if limit is not None and limit < 0:
+            raise ValueError("Limit cannot be negative.")
+        # Compared case-insensitively, like the attribute indexes
+        self.make = make.casefold() if make else None
+        self.model = model.casefold() if model else None
+        self.colour = colour.casefold() if colour else None
+        self.min_year = min_year
+        self.max_year = max_year
+        self.min_price = min_price
+        self.max_price = max_price
+        self.status = status
+        self.sort_by = sort_by
+        self.descending = descending
+        self.limit = limit
+
+    @property
+    def has_year_range(self) -> bool:
+        return self.min_year is not None or self.max_year is not None
+
+    def year_bounds(self) -> tuple[int, int]:
+        return (self.min_year if self.min_year is not None else -1,
+                self.max_year if self.max_year is not None else 10_000)
+
+    def price_bounds(self) -> tuple[float, float]:
+        return (self.min_price if self.min_price is not None else float("-inf"),
+                self.max_price if self.max_price is not None else float("inf"))
+
+    def matches(self, car) -> bool:
+        if self.status is not None and car.status != self.status:
+            return False
+        if self.make is not None and car.make.casefold() != self.make:
+            return False
+        if self.model is not None and car.model.casefold() != self.model:
+            return False
+        if self.colour is not None and car.colour.casefold() != self.colour:
+            return False
+        if self.min_year is not None and car.year < self.min_year:
+            return False
+        if self.max_year is not None and car.year > self.max_year:
+            return False
+        if self.min_price is not None and car.price < self.min_price:
+            return False
+        if self.max_price is not None and car.price > self.max_price:
+            return False
+        return True
+
+    def collect(self, cars, presorted: bool = False) -> list:
+        """Orders and trims the matching cars. With a limit, only the best few are kept
+        while streaming, instead of sorting everything. presorted means cars already
+        arrive in the requested order, so the stream can simply stop at the limit."""
+        if self.sort_by is None or presorted:
+            return list(islice(cars, self.limit))
+        key = SORT_KEYS[self.sort_by]
+        if self.limit is not None:
+            select = heapq.nlargest if self.descending else heapq.nsmallest
+            return select(self.limit, cars, key=key)
+        return sorted(cars, key=key, reverse=self.descending)
@@ -0,0 +1,321 @@
+# replay.py
+""" The replay module runs the dealership from a script instead of a keyboard.
+    A script is a JSONL file with one command per line, for example:
+
+      {"session": "t1", "command": "login", "user": "buyer", "password": "9999", "name": "Pat Lee"}
+      {"session": "t1", "command": "filter", "make": "Honda", "max_price": 30000, "sort_by": "price"}
+      {"session": "t1", "command": "add_to_cart", "vin": "VIN123"}
+      {"session": "t1", "command": "checkout", "card": "1234567812345678", "address": "1 Main St", "date": "2025-08-01"}
+
+    Each command runs the same handler the menus use. A ScriptConsole answers the
+    handler's prompts (including the payment and delivery ones) from the command's
+    fields, so nothing waits on a person. Commands from different sessions can be
+    interleaved, like terminals in a busy showroom; each session has its own login
+    and cart. Every command is timed, and the run ends with a summary per command.
+
+    Run with: python main.py --replay script.jsonl [--results results.jsonl]"""
+from __future__ import annotations
+import contextvars
+import json
+import sys
+import time
+from typing import Iterable, Iterator
+from console import Console, use_console
+from ecommerce import Cart
+from instrumentation import LatencyHistogram
+
+OK, FAILED, ERROR = "ok", "failed", "error"
+STAFF_ROLES = ("Admin", "Seller")
+DEFAULT_CARD = "1234567812345678"  # Accepted by the mock Payment
+
+class ScriptError(Exception):
+    """A command that cannot be run as written: unknown, missing a field or not allowed."""
+
+class ScriptConsole(Console):
+    """Answers prompts from a list given before each command. Output is thrown away
+    unless echo is set, in which case prompts and answers are shown as if typed."""
+    def __init__(self, echo: bool = False):
+        self.echo = echo
+        self._answers: list[str] = []
+
+    def feed(self, answers: Iterable):
+        """Sets the answers for the next command. Answers it does not ask for are dropped."""
+        self._answers = [str(answer) for answer in reversed(list(answers))]
+
+    def input(self, prompt: str = "") -> str:
+        if not self._answers:
+            raise ScriptError(f"Unexpected prompt: {prompt.strip()!r}")
+        answer = self._answers.pop()
+        if self.echo:
+            sys.stdout.write(f"{prompt}{answer}\n")
+        return answer
+
+    def write(self, text: str):
+        if self.echo:
+            sys.stdout.write(text)
+
+class ReplaySession:
+    """One scripted terminal: who is logged in and what is in their cart."""
+    __slots__ = ("name", "user", "cart")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.user = None
+        self.cart: Cart | None = None
+
+class CommandResult:
+    __slots__ = ("line", "session", "command", "status", "seconds", "detail")
+
+    def __init__(self, line: int, session: str, command: str, status: str, seconds: float, detail: str = ""):
+        self.line = line
+        self.session = session
+        self.command = command
+        self.status = status
+        self.seconds = seconds
+        self.detail = detail
+
+    def as_dict(self) -> dict:
+        return {"line": self.line, "session": self.session, "command": self.command, "status": self.status,
+                "ms": round(self.seconds * 1e3, 3), "detail": self.detail}
+
+class ReplayReport:
+    """Per-command outcome counts and latencies for one run."""
+    def __init__(self):
+        self.latencies: dict[str, LatencyHistogram] = {}
+        self.outcomes: dict[str, dict[str, int]] = {}
+        # Commands whose status differed from their "expect", and errors not expected at all
+        self.unexpected: list[CommandResult] = []
+        self.elapsed = 0.0
+
+    def add(self, result: CommandResult):
+        histogram = self.latencies.get(result.command)
+        if histogram is None:
+            histogram = self.latencies[result.command] = LatencyHistogram()
+            self.outcomes[result.command] = {OK: 0, FAILED: 0, ERROR: 0}
+        histogram.record(result.seconds)
+        self.outcomes[result.command][result.status] += 1
+
+    @property
+    def commands(self) -> int:
+        return sum(histogram.calls for histogram in self.latencies.values())
+
+    @property
+    def errors(self) -> int:
+        return sum(counts[ERROR] for counts in self.outcomes.values())
+
+    def summary(self) -> str:
+        lines = [f"{'Command':<18}{'Runs':>7}{'OK':>7}{'Failed':>8}{'Errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for command, histogram in self.latencies.items():
+            counts = self.outcomes[command]
+            lines.append(f"{command:<18}{histogram.calls:>7}{counts[OK]:>7}{counts[FAILED]:>8}{counts[ERROR]:>8}"
+                         f"{histogram.percentile(0.50) * 1e3:>10.3f}{histogram.percentile(0.95) * 1e3:>10.3f}"
+                         f"{histogram.max * 1e3:>10.3f}")
+        rate = self.commands / self.elapsed if self.elapsed else 0.0
+        lines.append(f"\n{self.commands} command(s) in {self.elapsed:.3f} s ({rate:,.0f}/s), "
+                     f"{self.errors} error(s), {len(self.unexpected)} unexpected outcome(s).")
+        for result in self.unexpected:
+            lines.append(f"- Line {result.line} ({result.command}): {result.status}"
+                         + (f" - {result.detail}" if result.detail else ""))
+        return "\n".join(lines)
+
+def read_script(lines: Iterable[str]) -> Iterator[tuple[int, dict]]:
+    """Yields (line number, command) for each non-blank line. Lines starting with # are comments."""
+    for number, text in enumerate(lines, 1):
+        text = text.strip()
+        if not text or text.startswith("#"):
+            continue
+        try:
+            command = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ScriptError(f"Line {number} is not valid JSON: {e}") from None
+        if not isinstance(command, dict) or "command" not in command:
+            raise ScriptError(f"Line {number} needs a \"command\" field.")
+        yield number, command
+
+def _blank(value) -> str:
+    """A prompt answer for an optional field; blank means "no limit" or "keep"."""
+    return "" if value is None else str(value)
+
+class ScriptRunner:
+    """Runs script commands against one dealership through the menu handlers.
+    handlers is the main module; it is passed in rather than imported, since main
+    is usually running as __main__."""
+    def __init__(self, handlers, inventory, user_manager, echo: bool = False):
+        self.handlers = handlers
+        self.inventory = inventory
+        self.user_manager = user_manager
+        self.console = ScriptConsole(echo)
+        self.sessions: dict[str, ReplaySession] = {}
+        self._commands = {
+            "login": self._login, "logout": self._logout,
+            "browse": self._browse, "filter": self._filter,
+            "add_to_cart": self._add_to_cart, "remove_from_cart": self._remove_from_cart,
+            "discount": self._discount, "checkout": self._checkout,
+            "reprice": self._reprice, "status": self._status,
+            "report": self._report, "import": self._import,
+        }
+
+    def run(self, script: Iterable[tuple[int, dict]], results=None) -> ReplayReport:
+        """Runs every command, writing one JSON line per command to results if given.
+        Carts still holding cars at the end are cleared so their holds are released."""
+        return contextvars.copy_context().run(self._run, script, results)
+
+    def _run(self, script, results) -> ReplayReport:
+        use_console(self.console) # Only inside this run's context; the caller's console is untouched
+        report = ReplayReport()
+        started = time.perf_counter()
+        try:
+            for line, command in script:
+                result = self.run_command(line, command)
+                report.add(result)
+                expect = command.get("expect")
+                if expect != result.status and (expect is not None or result.status == ERROR):
+                    report.unexpected.append(result)
+                if results is not None:
+                    results.write(json.dumps(result.as_dict()) + "\n")
+        finally:
+            for session in self.sessions.values():
+                if session.cart is not None:
+                    session.cart.clear()
+            report.elapsed = time.perf_counter() - started
+        return report
+
+    def run_command(self, line: int, command: dict) -> CommandResult:
+        name = command["command"]
+        session = self._session(str(command.get("session", "main")))
+        start = time.perf_counter()
+        try:
+            handler = self._commands.get(name)
+            if handler is None:
+                raise ScriptError(f"Unknown command '{name}'. Commands: {', '.join(self._commands)}.")
+            ok = handler(session, command)
+            status, detail = (OK if ok else FAILED), ""
+        except ScriptError as e:
+            status, detail = ERROR, str(e)
+        except Exception as e: # Recorded, not raised: one bad line should not end a long replay
+            status, detail = ERROR, f"{type(e).__name__}: {e}"
+        return CommandResult(line, session.name, name, status, time.perf_counter() - start, detail)
+
+    def _session(self, name: str) -> ReplaySession:
+        session = self.sessions.get(name)
+        if session is None:
+            session = self.sessions[name] = ReplaySession(name)
+        return session
+
+    def _ask(self, *answers):
+        self.console.feed(answers)
+
+    @staticmethod
+    def _field(command: dict, name: str):
+        if name not in command:
+            raise ScriptError(f"'{command['command']}' needs a \"{name}\" field.")
+        return command[name]
+
+    def _vin_answers(self, command: dict) -> list:
+        """Answers for a VIN prompt, plus the "did you mean" prompt that follows when the VIN is not exact."""
+        vin = str(self._field(command, "vin")).strip().upper()
+        if self.inventory.find_car(vin) is not None:
+            return [vin]
+        return [vin, "y" if command.get("accept_suggestion") else "n"]
+
+    def _require_user(self, session: ReplaySession, roles: tuple[str, ...] | None = None):
+        if session.user is None:
+            raise ScriptError(f"Session '{session.name}' is not logged in.")
+        if roles is not None and session.user.role_type not in roles:
+            raise ScriptError(f"{session.user.role_type} '{session.user.username}' cannot do that.")
+        return session.user
+
+    # ---------------- Commands ----------------
+    # Each returns True if the handler succeeded, False if it reported a failure
+
+    def _login(self, session: ReplaySession, command: dict) -> bool:
+        self._logout(session, command)
+        username = str(self._field(command, "user")).lower()
+        terminal = str(command.get("terminal", session.name))
+        self._ask(self._field(command, "password"), command.get("name") or username.title())
+        user = self.user_manager.login(username, terminal)
+        if user is None:
+            return False
+        session.user = user
+        session.cart = Cart(user, self.inventory.holds)
+        return True
+
+    def _logout(self, session: ReplaySession, command: dict) -> bool:
+        if session.cart is not None:
+            session.cart.clear()
+        session.user = session.cart = None
+        return True
+
+    def _browse(self, session: ReplaySession, command: dict) -> bool:
+        cursor = None
+        for _ in range(int(command.get("pages", 1))):
+            cursor = self.handlers.print_inventory_page(self.inventory, cursor, bool(command.get("include_sold")))
+            if cursor is None:
+                break
+        return True
+
+    def _filter(self, session: ReplaySession, command: dict) -> bool:
+        sort_by = command.get("sort_by")
+        if sort_by not in (None, "price", "year", "make"):
+            raise ScriptError("Filters can be sorted by price, year or make.")
+        answers = [_blank(command.get(name)) for name in
+                   ("make", "model", "colour", "min_year", "max_year", "min_price", "max_price")]
+        answers.append(_blank(sort_by))
+        if sort_by:
+            answers.append("y" if command.get("descending") else "n")
+        answers.append(_blank(command.get("limit")))
+        self._ask(*answers)
+        self.handlers.handle_combined_search(self.inventory)
+        return True
+
+    def _add_to_cart(self, session: ReplaySession, command: dict) -> bool:
+        self._require_user(session)
+        self._ask("y" if command.get("accept_suggestion") else "n")
+        car = self.handlers.find_car_with_suggestion(self.inventory, str(self._field(command, "vin")))
+        if car is None:
+            return False
+        session.cart.add_item(car)
+        return session.cart.is_holding(car.vin)
+
+    def _remove_from_cart(self, session: ReplaySession, command: dict) -> bool:
+        self._require_user(session)
+        vin = str(self._field(command, "vin")).upper()
+        if vin not in session.cart.items:
+            return False
+        session.cart.remove_item(vin)
+        return True
+
+    def _discount(self, session: ReplaySession, command: dict) -> bool:
+        self._require_user(session)
+        return session.cart.apply_discount(str(self._field(command, "code")))
+
+    def _checkout(self, session: ReplaySession, command: dict) -> bool:
+        user = self._require_user(session)
+        if not session.cart.items:
+            return False
+        self._ask("y", command.get("card", DEFAULT_CARD), command.get("address", ""), command.get("date", ""))
+        if not self.handlers.handle_checkout(user, session.cart, self.inventory):
+            return False
+        session.cart.clear()
+        session.cart = Cart(user, self.inventory.holds)
+        return True
+
+    def _reprice(self, session: ReplaySession, command: dict) -> bool:
+        user = self._require_user(session, STAFF_ROLES)
+        self._ask(*self._vin_answers(command), self._field(command, "price"))
+        return self.handlers.handle_update_price(self.inventory, user.role_type == "Admin")
+
+    def _status(self, session: ReplaySession, command: dict) -> bool:
+        user = self._require_user(session, STAFF_ROLES)
+        self._ask(*self._vin_answers(command), self._field(command, "status"))
+        return self.handlers.handle_update_status(self.inventory, user.role_type == "Admin")
+
+    def _report(self, session: ReplaySession, command: dict) -> bool:
+        self._require_user(session, ("Admin",))
+        self.handlers.handle_reports(self.inventory)
+        return True
+
+    def _import(self, session: ReplaySession, command: dict) -> bool:
+        self._require_user(session, ("Admin",))
+        self._ask(self._field(command, "path"))
+        return self.handlers.handle_import(self.inventory)
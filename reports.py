@@ -0,0 +1,66 @@
+# reports.py
+""" The reports module keeps running sales and profit totals for the dealership.
+    Totals are adjusted as each car is sold, un-sold, repriced or removed, so a
+    report reads the figures directly instead of rescanning the inventory."""
+
+class SalesTotals:
+    """Units sold, revenue and cost of goods sold for one slice of the sales."""
+    __slots__ = ("label", "units", "revenue", "cost")
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.units = 0
+        self.revenue = 0.0
+        self.cost = 0.0
+
+    @property
+    def profit(self) -> float:
+        return self.revenue - self.cost
+
+    def _apply(self, sign: int, price: float, cost: float):
+        self.units += sign
+        self.revenue += sign * price
+        self.cost += sign * cost
+
+class SalesLedger:
+    """Overall, per-make and per-model sales totals for the sold cars in an inventory.
+    The figures each sold VIN contributed are remembered, so any change to the car is
+    applied as "take back the old contribution, add the new one".
+    """
+    def __init__(self):
+        self.overall = SalesTotals("All Sales")
+        self.by_make: dict[str, SalesTotals] = {}
+        self.by_model: dict[tuple[str, str], SalesTotals] = {}
+        self._entries: dict[str, tuple[str, str, float, float]] = {}
+
+    def __len__(self) -> int:
+        return self.overall.units
+
+    def record(self, car):
+        """Brings the ledger up to date with the car's current state."""
+        self.forget(car.vin)
+        if car.status != "Sold":
+            return
+        entry = (car.make, car.model, car.price, car.cost)
+        self._entries[car.vin] = entry
+        self._apply(1, *entry)
+
+    def forget(self, vin: str):
+        entry = self._entries.pop(vin, None)
+        if entry is not None:
+            self._apply(-1, *entry)
+
+    def _apply(self, sign: int, make: str, model: str, price: float, cost: float):
+        self.overall._apply(sign, price, cost)
+        make_key = make.casefold()
+        model_key = (make_key, model.casefold())
+        for table, key, label in ((self.by_make, make_key, make), (self.by_model, model_key, f"{make} {model}")):
+            totals = table.get(key)
+            if totals is None:
+                totals = table[key] = SalesTotals(label)
+            totals._apply(sign, price, cost)
+            # Drop empty slices so running float sums never drift around zero.
+            if totals.units == 0:
+                del table[key]
+        if self.overall.units == 0:
+            self.overall = SalesTotals("All Sales")
@@ -0,0 +1,126 @@
+# reprice.py
+""" The reprice module works out new prices for a batch of cars, as used by
+    Inventory.bulk_reprice for month-end markdowns and similar sweeping changes.
+    The rule and the minimum-margin floor are applied to the whole batch at once:
+    as NumPy array operations when NumPy is installed, otherwise in a plain loop.
+    Nothing here touches a Car; the Inventory applies the result, or none of it."""
+from __future__ import annotations
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the same rules run as a Python loop.
+    np = None
+
+RULE_KINDS = ("percent", "amount", "margin")
+
+class RepriceRule:
+    """How to reprice each car:
+    percent -- change the price by value percent (-15 is a 15% markdown);
+    amount  -- change the price by value dollars (-500 takes $500 off);
+    margin  -- set the price to cost plus value percent, the same way
+               Car.MIN_PROFIT_MARGIN is measured."""
+    __slots__ = ("kind", "value")
+
+    def __init__(self, kind: str, value: float):
+        if kind not in RULE_KINDS:
+            raise ValueError(f"A reprice rule must be one of {', '.join(RULE_KINDS)}.")
+        if kind == "percent" and value <= -100:
+            raise ValueError("A percentage change must be greater than -100%.")
+        if kind == "margin" and value < 0:
+            raise ValueError("A target margin cannot be negative.")
+        self.kind = kind
+        self.value = float(value)
+
+    def __repr__(self):
+        if self.kind == "percent":
+            return f"{self.value:+g}%"
+        if self.kind == "amount":
+            return f"{'+' if self.value >= 0 else '-'}${abs(self.value):,.2f}"
+        return f"cost + {self.value:g}%"
+
+class RepriceReport:
+    """What a bulk reprice did. clamped holds (vin, requested price, price given) for cars
+    raised to the minimum price; rejected holds (vin, requested price, reason). When
+    anything is rejected, applied is False and no car was changed."""
+    __slots__ = ("rule", "selected", "changed", "applied", "clamped", "rejected")
+
+    def __init__(self, rule: RepriceRule, selected: int):
+        self.rule = rule
+        self.selected = selected
+        self.changed = 0
+        self.applied = False
+        self.clamped: list[tuple[str, float, float]] = []
+        self.rejected: list[tuple[str, float, str]] = []
+
+    def summary(self) -> str:
+        if not self.applied:
+            return f"Repriced nothing ({self.rule}): {len(self.rejected)} of {self.selected} car(s) rejected."
+        return (f"Repriced {self.changed} of {self.selected} car(s) ({self.rule}), "
+                f"{len(self.clamped)} raised to the minimum price.")
+
+def minimum_prices(costs, margin: float):
+    """Lowest allowed price for each cost, rounded up to the cent. The inner round stops
+    float noise (20000 * 1.1 is 22000.000000000004) from costing an extra cent."""
+    if np is not None:
+        return np.ceil(np.round(np.asarray(costs, dtype=np.float64) * (1 + margin) * 100, 6)) / 100
+    return [math.ceil(round(cost * (1 + margin) * 100, 6)) / 100 for cost in costs]
+
+def plan_prices(rule: RepriceRule, prices, costs, floor_margin: float | None, clamp: bool = True):
+    """Returns (new prices, [(position, requested price)] of clamped cars, [(position, reason)]
+    of rejected cars) for parallel sequences of current prices and costs.
+    floor_margin None means no floor (an admin)."""
+    if np is not None:
+        return _plan_vectorized(rule, np.asarray(prices, dtype=np.float64),
+                                np.asarray(costs, dtype=np.float64), floor_margin, clamp)
+    return _plan_loop(rule, prices, costs, floor_margin, clamp)
+
+def _plan_vectorized(rule, prices, costs, floor_margin, clamp):
+    if rule.kind == "percent":
+        wanted = np.round(prices * (1 + rule.value / 100), 2)
+    elif rule.kind == "amount":
+        wanted = np.round(prices + rule.value, 2)
+    else:
+        wanted = np.round(costs * (1 + rule.value / 100), 2)
+    negative = wanted < 0
+    if floor_margin is None:
+        below = np.zeros(len(wanted), dtype=bool)
+        floors = wanted
+    else:
+        floors = minimum_prices(costs, floor_margin)
+        below = (wanted < floors) & ~negative
+    rejected = [(int(i), "price would be negative") for i in np.flatnonzero(negative)]
+    if clamp:
+        new = np.where(below, floors, wanted)
+        clamped = [(int(i), float(wanted[i])) for i in np.flatnonzero(below)]
+    else:
+        new = wanted
+        clamped = []
+        rejected += [(int(i), f"below the minimum price of ${floors[i]:,.2f}") for i in np.flatnonzero(below)]
+        rejected.sort()
+    return new.tolist(), clamped, rejected
+
+def _cents(amount: float) -> float:
+    """Rounds to the cent exactly as np.round(amount, 2) does, so both paths agree."""
+    return round(amount * 100) / 100
+
+def _plan_loop(rule, prices, costs, floor_margin, clamp):
+    floors = minimum_prices(costs, floor_margin) if floor_margin is not None else None
+    new, clamped, rejected = [], [], []
+    for i, (price, cost) in enumerate(zip(prices, costs)):
+        if rule.kind == "percent":
+            wanted = _cents(price * (1 + rule.value / 100))
+        elif rule.kind == "amount":
+            wanted = _cents(price + rule.value)
+        else:
+            wanted = _cents(cost * (1 + rule.value / 100))
+        if wanted < 0:
+            rejected.append((i, "price would be negative"))
+        elif floors is not None and wanted < floors[i]:
+            if clamp:
+                clamped.append((i, wanted))
+                wanted = floors[i]
+            else:
+                rejected.append((i, f"below the minimum price of ${floors[i]:,.2f}"))
+        new.append(wanted)
+    return new, clamped, rejected
@@ -0,0 +1,151 @@
+# reservations.py
+""" The reservations module holds cars for shoppers while they sit in a cart.
+    Adding a car to a cart reserves it for a limited time; if the buyer has not
+    checked out by then, the car goes back on sale automatically. Expiry times are
+    kept in a heap, so the background thread only ever looks at the next hold due
+    and never scans the inventory."""
+import heapq
+import itertools
+import threading
+import time
+
+DEFAULT_HOLD_SECONDS = 15 * 60
+
+class Hold:
+    __slots__ = ("car", "holder", "expires_at", "token")
+
+    def __init__(self, car, holder, expires_at: float, token: int):
+        self.car = car
+        self.holder = holder
+        self.expires_at = expires_at
+        self.token = token
+
+class HoldScheduler:
+    """Places time-limited holds on cars and releases them through Car.mark_available when they run out.
+    Released or taken holds leave a stale heap entry behind; each entry carries a token,
+    so stale ones are skipped when they reach the top, and the heap is rebuilt if they pile up.
+    Lock order is always car lock, then the scheduler's own lock.
+    While the scheduler reserves or releases a car itself, is_changing(vin) is True, so
+    listeners can tell its own status changes from anyone else's.
+    """
+    def __init__(self, hold_seconds: float = DEFAULT_HOLD_SECONDS, clock=time.monotonic):
+        self.hold_seconds = hold_seconds
+        self._clock = clock
+        self._holds: dict[str, Hold] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._tokens = itertools.count()
+        self._condition = threading.Condition()
+        self._worker: threading.Thread | None = None
+        self._changing: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    def hold(self, car, holder) -> bool:
+        """Reserves car for holder. Returns False if the car is not available to hold."""
+        with car.lock():
+            if not car.is_available():
+                return False
+            with self._condition:
+                expires_at = self._clock() + self.hold_seconds
+                token = next(self._tokens)
+                # Registered before the status changes so listeners can already tell it is a cart hold
+                self._holds[car.vin] = Hold(car, holder, expires_at, token)
+                heapq.heappush(self._heap, (expires_at, token, car.vin))
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="hold-expiry", daemon=True)
+                    self._worker.start()
+                elif self._heap[0][1] == token:
+                    self._condition.notify() # The new hold is due before anything else
+            self._set_status(car, car.reserve)
+        return True
+
+    def __contains__(self, vin: str) -> bool:
+        return vin in self._holds
+
+    def is_changing(self, vin: str) -> bool:
+        """True while the scheduler itself is reserving or releasing vin."""
+        return vin in self._changing
+
+    def _set_status(self, car, change):
+        """Runs car.reserve or car.mark_available as the scheduler's own change.
+        The caller must hold the car's lock."""
+        self._changing.add(car.vin)
+        try:
+            change()
+        finally:
+            self._changing.discard(car.vin)
+
+    def is_held_by(self, vin: str, holder) -> bool:
+        hold = self._holds.get(vin)
+        return hold is not None and hold.holder is holder
+
+    def remaining(self, vin: str, holder) -> float | None:
+        """Seconds left on holder's hold of vin, or None if holder does not hold it."""
+        hold = self._holds.get(vin)
+        if hold is None or hold.holder is not holder:
+            return None
+        return max(0.0, hold.expires_at - self._clock())
+
+    def take(self, vin: str, holder) -> bool:
+        """Ends holder's hold without releasing the car, e.g. because it is being sold.
+        The caller must hold the car's lock."""
+        with self._condition:
+            hold = self._holds.get(vin)
+            if hold is None or hold.holder is not holder:
+                return False
+            del self._holds[vin]
+            self._compact()
+            return True
+
+    def release(self, vin: str, holder) -> bool:
+        """Ends holder's hold and puts the car back on sale."""
+        hold = self._holds.get(vin)
+        if hold is None:
+            return False
+        with hold.car.lock():
+            if not self.take(vin, holder):
+                return False
+            if hold.car.status == "Reserved":
+                self._set_status(hold.car, hold.car.mark_available)
+        return True
+
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._holds) + 1024:
+            self._heap = [(hold.expires_at, hold.token, vin) for vin, hold in self._holds.items()]
+            heapq.heapify(self._heap)
+
+    def expire_due(self) -> int:
+        """Releases every hold whose time is up. Returns how many were released."""
+        due = []
+        with self._condition:
+            now = self._clock()
+            while self._heap and self._heap[0][0] <= now:
+                _, token, vin = heapq.heappop(self._heap)
+                hold = self._holds.get(vin)
+                if hold is not None and hold.token == token:
+                    due.append(hold)
+
+        released = 0
+        for hold in due:
+            with hold.car.lock():
+                with self._condition:
+                    # Checked again: the buyer may have checked out or let go in the meantime
+                    if self._holds.get(hold.car.vin) is not hold:
+                        continue
+                    del self._holds[hold.car.vin]
+                if hold.car.status == "Reserved":
+                    self._set_status(hold.car, hold.car.mark_available)
+                    released += 1
+        return released
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                delay = self._heap[0][0] - self._clock()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+            self.expire_due()
@@ -0,0 +1,136 @@
+# server.py
+""" The server module lets many showroom terminals share one dealership.
+    An asyncio server accepts plain line-based connections over TCP or a Unix socket
+    (netcat or telnet is all a terminal needs). Every connection runs the normal
+    menus against the same Inventory and UserManager.
+
+    All socket I/O happens on the event loop. The menu code itself is ordinary
+    blocking code, so each session runs it on a small-stack thread that sleeps until
+    its user types a line; an idle session costs one parked thread and no CPU.
+
+    Run from the project root:
+      python server.py --port 8023          then: nc localhost 8023
+      python server.py --unix /tmp/dealer.sock   then: nc -U /tmp/dealer.sock
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import itertools
+import threading
+from console import Console, use_console
+from inventory import Inventory
+from auth import UserManager
+import main as dealership
+
+SESSION_STACK_SIZE = 256 * 1024  # Menu code is shallow; the default 8 MB stack is wasted per session
+
+def _start_session_thread(target, name: str) -> threading.Thread:
+    """Starts target on a thread with a SESSION_STACK_SIZE stack. threading.stack_size is
+    process-wide, so it is set only while this thread is created and then put back, leaving
+    the analytics, fulfilment and hold-expiry threads on the default stack."""
+    previous = threading.stack_size(SESSION_STACK_SIZE)
+    try:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+    finally:
+        threading.stack_size(previous)
+    return thread
+
+class SocketConsole(Console):
+    """Routes a session's input() and print() to its connection via the event loop."""
+    def __init__(self, loop: asyncio.AbstractEventLoop, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._loop = loop
+        self._reader = reader
+        self._writer = writer
+
+    def write(self, text: str):
+        data = text.replace("\n", "\r\n").encode("utf-8")
+        self._loop.call_soon_threadsafe(self._write, data)
+
+    def _write(self, data: bytes):
+        if not self._writer.is_closing():
+            self._writer.write(data)
+
+    def input(self, prompt: str = "") -> str:
+        if prompt:
+            self.write(prompt)
+        line = asyncio.run_coroutine_threadsafe(self._reader.readline(), self._loop).result()
+        if not line:
+            raise EOFError("Terminal disconnected.")
+        return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+class DealershipServer:
+    """Serves the dealership menus to every connected terminal."""
+    def __init__(self, inventory: Inventory, user_manager: UserManager):
+        self.inventory = inventory
+        self.user_manager = user_manager
+        self.sessions = 0
+        self._session_ids = itertools.count(1)
+
+    def _run_session(self, console: SocketConsole, terminal: str):
+        use_console(console)
+        try:
+            dealership.print_header("E-Commerce Car Dealership Simulation")
+            dealership.run_main_menu(self.inventory, self.user_manager, terminal)
+            console.write("\nGoodbye!\n")
+        except EOFError:
+            pass # The terminal hung up mid-menu
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        peer = writer.get_extra_info("peername") or "local socket"
+        # Each connection is its own terminal for login limits; the per-user limit still
+        # applies across all of them, so spreading guesses over connections does not help
+        if isinstance(peer, tuple):
+            terminal = f"{peer[0]}:{peer[1]}"
+        else:
+            terminal = f"{peer}#{next(self._session_ids)}"  # Unix socket peers have no address
+        self.sessions += 1
+        print(f"Session opened: {peer} ({self.sessions} active)")
+
+        finished = loop.create_future()
+        def session():
+            try:
+                self._run_session(SocketConsole(loop, reader, writer), terminal)
+            finally:
+                loop.call_soon_threadsafe(finished.set_result, None)
+
+        # Sessions are only started here, on the event loop thread, so they never race each other
+        _start_session_thread(session, f"session-{terminal}")
+        try:
+            await finished
+        finally:
+            self.sessions -= 1
+            print(f"Session closed: {peer} ({self.sessions} active)")
+            writer.close()
+
+    async def serve(self, host: str | None = None, port: int | None = None, unix_path: str | None = None):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host=host, port=port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Dealership server listening on {addresses}")
+        async with server:
+            await server.serve_forever()
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Serve the dealership menus to many terminals.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: local only)")
+    parser.add_argument("--port", type=int, default=8023)
+    parser.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--data-dir", default=dealership.DATA_DIR, help="Where the journal and snapshots are kept")
+    parser.add_argument("--columnar", action="store_true", help="Keep a NumPy columnar copy of the lot (see main.py --columnar)")
+    args = parser.parse_args(argv)
+
+    inventory, user_manager, data_store = dealership.open_dealership(args.data_dir, args.columnar)
+    try:
+        asyncio.run(DealershipServer(inventory, user_manager).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        dealership.fulfilment.close()
+        data_store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# storage.py
+""" The storage module makes the dealership's data survive a restart.
+    Every change to the inventory and the user list is appended to a journal file.
+    Appends are group-committed: records collect in memory and are written and
+    fsync'd together, either when a batch fills up or every few milliseconds.
+    Once the journal has grown about as large as the data itself, a compacted
+    snapshot is written and the journal starts again, so startup loads the
+    snapshot and replays only the short tail of the journal. Snapshots are taken
+    by the background flusher, never by the thread making the change, since that
+    thread holds the inventory lock."""
+from __future__ import annotations
+import json
+import os
+import shutil
+import threading
+from datetime import date
+from typing import TYPE_CHECKING
+from car import Car
+from auth import User
+if TYPE_CHECKING:
+    from inventory import Inventory
+    from auth import UserManager
+
+SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_FILE = "journal.log"
+# The journal a snapshot in progress is replacing; deleted once the snapshot is safely written
+ROTATED_JOURNAL_FILE = "journal.old"
+DATE_ATTRIBUTES = ("sold_date", "delivery_date")
+
+def _encode(attribute: str, value):
+    if attribute in DATE_ATTRIBUTES and isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _decode(attribute: str, value):
+    if attribute in DATE_ATTRIBUTES and value is not None:
+        return date.fromisoformat(value)
+    return value
+
+class DataStore:
+    """Journals inventory and user changes into a directory and restores them on startup."""
+    def __init__(self, directory: str, group_size: int = 64, flush_interval: float = 0.05,
+                 snapshot_every: int = 10_000):
+        self.directory = directory
+        self.group_size = group_size
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self._lock = threading.RLock()
+        self._pending: list[str] = []
+        self._seq = 0
+        self._since_snapshot = 0
+        self._snapshot_due = False
+        self._snapshot_lock = threading.Lock() # One snapshot at a time
+        self._journal = None
+        self._journal_end: int | None = None
+        self._flusher: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._inventory: Inventory | None = None
+        self._user_manager: UserManager | None = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # ---------------- Startup ----------------
+
+    def load(self, inventory: Inventory, user_manager: UserManager) -> bool:
+        """Restores the snapshot and replays the journal tail. Returns False if nothing was saved yet."""
+        found = False
+        snapshot_path = self._path(SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            for record in snapshot["users"]:
+                user_manager.add_user(User.from_record(record))
+            for record in snapshot["cars"]:
+                inventory.add_car(Car.from_record(record))
+            self._seq = snapshot["seq"]
+            found = True
+
+        snapshot_seq = self._seq
+        # A crash mid-snapshot leaves the journal it was replacing behind; its records come first
+        self._replay_journal(self._path(ROTATED_JOURNAL_FILE), inventory, user_manager)
+        self._journal_end = self._replay_journal(self._path(JOURNAL_FILE), inventory, user_manager)
+        return found or self._seq > snapshot_seq
+
+    def _replay_journal(self, path: str, inventory: Inventory, user_manager: UserManager) -> int | None:
+        """Replays the records in path newer than the snapshot. Returns the byte offset just
+        past the last complete record, or None if there is no such file."""
+        if not os.path.exists(path):
+            return None
+        end = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # A torn final write from a crash; everything before it is intact.
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                end += len(line)
+                if record["seq"] <= self._seq:
+                    continue
+                self._replay(record, inventory, user_manager)
+                self._seq = record["seq"]
+                self._since_snapshot += 1
+        return end
+
+    def _replay(self, record: dict, inventory: Inventory, user_manager: UserManager):
+        kind = record["type"]
+        if kind == "car_added":
+            inventory.add_car(Car.from_record(record["car"]))
+        elif kind == "car_removed":
+            inventory.remove_car(record["vin"])
+        elif kind == "car_changed":
+            attribute = record["attribute"]
+            inventory.update_car(record["vin"], **{attribute: _decode(attribute, record["value"])})
+        elif kind == "user_added":
+            # May already be in a snapshot taken while the user was being added
+            if user_manager.get_user(record["user"]["username"]) is None:
+                user_manager.add_user(User.from_record(record["user"]))
+        elif kind == "user_role_changed":
+            user = user_manager.get_user(record["username"])
+            if user:
+                user.role_type = record["role"]
+        elif kind == "user_name_changed":
+            user = user_manager.get_user(record["username"])
+            if user:
+                user.full_name = record["full_name"]
+
+    # ---------------- Journaling ----------------
+
+    def attach(self, inventory: Inventory, user_manager: UserManager):
+        """Starts journaling every later change to inventory and user_manager."""
+        self._inventory = inventory
+        self._user_manager = user_manager
+        journal_path = self._path(JOURNAL_FILE)
+        if self._journal_end is not None and os.path.getsize(journal_path) > self._journal_end:
+            os.truncate(journal_path, self._journal_end)  # Cut off the torn line so new records start clean
+        self._journal = open(journal_path, "a", encoding="utf-8")
+        inventory.add_listener(self._on_inventory_change)
+        user_manager.add_listener(self._on_user_change)
+        self._flusher = threading.Thread(target=self._flush_periodically, name="journal-flusher", daemon=True)
+        self._flusher.start()
+
+    def _on_inventory_change(self, action, car, attribute, old_value):
+        if action == "added":
+            self._append({"type": "car_added", "car": car.to_record()})
+        elif action == "removed":
+            self._append({"type": "car_removed", "vin": car.vin})
+        elif action == "changed":
+            if attribute == "status" and self._inventory.holds.is_changing(car.vin):
+                return  # Cart holds are not saved, so a restart never leaves a car stuck Reserved
+            value = getattr(car, attribute)
+            self._append({"type": "car_changed", "vin": car.vin, "attribute": attribute,
+                          "value": _encode(attribute, value)})
+
+    def _on_user_change(self, action, user):
+        if action == "added":
+            self._append({"type": "user_added", "user": user.to_record()})
+        elif action == "role_changed":
+            self._append({"type": "user_role_changed", "username": user.username, "role": user.role_type})
+        elif action == "name_changed":
+            self._append({"type": "user_name_changed", "username": user.username, "full_name": user.full_name})
+
+    def _append(self, record: dict):
+        with self._lock:
+            self._seq += 1
+            record["seq"] = self._seq
+            self._pending.append(json.dumps(record) + "\n")
+            self._since_snapshot += 1
+            if len(self._pending) >= self.group_size:
+                self.flush()
+            if self._since_snapshot >= max(self.snapshot_every, self._live_records()):
+                self._snapshot_due = True # Taken by the flusher; this thread may hold the inventory lock
+
+    def _live_records(self) -> int:
+        inventory_size = len(self._inventory.cars) if self._inventory else 0
+        users = len(self._user_manager.list_users()) if self._user_manager else 0
+        return inventory_size + users
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if self._snapshot_due:
+                self.snapshot()
+
+    def flush(self):
+        """Writes and fsyncs every pending record as one group commit."""
+        with self._lock:
+            if not self._pending or self._journal is None:
+                return
+            self._journal.write("".join(self._pending))
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._pending.clear()
+
+    def snapshot(self):
+        """Writes the full current state and starts an empty journal after it.
+        Only the switch to a new journal holds the store's lock. The state is copied and
+        written without it, so changes (appended under the inventory lock) carry on meanwhile."""
+        with self._snapshot_lock:
+            with self._lock:
+                self.flush()
+                seq = self._seq
+                self._rotate_journal()
+                self._since_snapshot = 0
+                self._snapshot_due = False
+            # Changes after seq go to the new journal. The copy may already include some of
+            # them; replaying those over the snapshot just applies the same values again.
+            state = {
+                "seq": seq,
+                "users": [user.to_record() for user in self._user_manager.list_users()],
+                "cars": [self._car_record(car) for car in list(self._inventory.cars.values())],
+            }
+            temp_path = self._path(SNAPSHOT_FILE + ".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self._path(SNAPSHOT_FILE))
+            os.remove(self._path(ROTATED_JOURNAL_FILE))
+
+    def _rotate_journal(self):
+        """Moves the current journal aside as the rotated one and opens an empty journal."""
+        if self._journal is not None:
+            self._journal.close()
+        journal_path = self._path(JOURNAL_FILE)
+        rotated_path = self._path(ROTATED_JOURNAL_FILE)
+        if os.path.exists(rotated_path):
+            # An earlier snapshot never finished: its records are not saved anywhere else yet
+            with open(rotated_path, "ab") as rotated, open(journal_path, "rb") as journal:
+                shutil.copyfileobj(journal, rotated)
+            os.remove(journal_path)
+        else:
+            os.replace(journal_path, rotated_path)
+        self._journal = open(journal_path, "w", encoding="utf-8")
+
+    def _car_record(self, car: Car) -> dict:
+        record = car.to_record()
+        if car.vin in self._inventory.holds and record["status"] == "Reserved":
+            record["status"] = "Available"  # Held in someone's cart; it goes back on sale after a restart
+        return record
+
+    def close(self):
+        """Flushes outstanding records and stops the background flusher."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self.flush()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None